@@ -0,0 +1,131 @@
+"""Load test for the /fetch-documents read path: Motor-backed DBUtils against the old blocking pymongo reads.
+
+Fires `requests` fetches of one user's documents at each concurrency level and reports throughput.
+With the blocking driver every read holds the event loop, so throughput stays flat as concurrency
+grows; with Motor the round trips overlap and throughput scales until the pool or server saturates.
+
+Run from tagging_api/:
+    python benchmarks/fetch_documents_load_test.py --uri mongodb://localhost:27017
+    python benchmarks/fetch_documents_load_test.py --simulate-latency-ms 5     # no mongod needed
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+# The scratch collection is dropped afterwards; keep it out of the app database unless told otherwise
+os.environ.setdefault("DATABASE_NAME", "fetch_documents_load_test")
+
+from db.crud import connect_db
+
+COLLECTION = "fetch_documents_load_test"
+USER_ID = "load-test-user"
+FIELDS = ["doc_id", "file_name"]
+
+class SimulatedCursor:
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+        self.limit_count = 0
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        # Synchronous drivers block the whole thread, and with it the event loop, for the round trip
+        time.sleep(self.latency)
+        return iter(self.documents[:self.limit_count or None])
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.latency)
+        for document in self.documents[:self.limit_count or None]:
+            yield document
+
+class SimulatedCollection:
+    """Stands in for a collection whose every query costs one network round trip of `latency` seconds"""
+
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+
+    def find(self, query, projection=None):
+        return SimulatedCursor(self.documents, self.latency)
+
+def seed_documents(count):
+    return [{"_id": f"{i:024x}", "user_id": USER_ID, "doc_id": f"doc-{i}", "file_name": f"file-{i}.pdf"}
+            for i in range(count)]
+
+async def motor_fetch(limit):
+    await connect_db.read_page(COLLECTION, {"user_id": USER_ID}, FIELDS, limit=limit)
+
+def blocking_fetcher(collection):
+    async def fetch(limit):
+        # What DBUtils did before Motor: a synchronous driver call inside an async def
+        [doc for doc in collection.find({"user_id": USER_ID}, FIELDS).sort("_id", 1).limit(limit + 1)]
+    return fetch
+
+async def throughput(fetch, concurrency, requests, limit):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            await fetch(limit)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    return requests / (time.perf_counter() - start)
+
+async def run(args):
+    documents = seed_documents(args.documents)
+    if args.uri:
+        from pymongo import MongoClient
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.uri, maxPoolSize=max(args.concurrency))
+        connect_db.use_client(client)
+        await connect_db.db[COLLECTION].drop()
+        await connect_db.db[COLLECTION].insert_many([{k: v for k, v in d.items() if k != "_id"} for d in documents])
+        await connect_db.create_index(COLLECTION, [("user_id", 1), ("_id", 1)])
+        sync_client = MongoClient(args.uri)
+        blocking_collection = sync_client[connect_db.database_name][COLLECTION]
+        target = args.uri
+    else:
+        latency = args.simulate_latency_ms / 1000
+        connect_db.db = {COLLECTION: SimulatedCollection(documents, latency)}
+        blocking_collection = SimulatedCollection(documents, latency)
+        target = f"simulated {args.simulate_latency_ms} ms round trip"
+
+    print(f"{args.requests} fetches of {args.limit} documents per level against {target}")
+    print(f"{'concurrency':>11}  {'blocking req/s':>14}  {'motor req/s':>11}  {'speedup':>7}")
+    for concurrency in args.concurrency:
+        blocking = await throughput(blocking_fetcher(blocking_collection), concurrency, args.requests, args.limit)
+        motor = await throughput(motor_fetch, concurrency, args.requests, args.limit)
+        print(f"{concurrency:>11}  {blocking:>14.0f}  {motor:>11.0f}  {motor / blocking:>6.1f}x")
+
+    if args.uri:
+        await connect_db.db[COLLECTION].drop()
+        sync_client.close()
+        connect_db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="MongoDB URI to test against; the simulated collection is used when omitted")
+    parser.add_argument("--simulate-latency-ms", type=float, default=5.0)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100, help="page size of each fetch")
+    parser.add_argument("--requests", type=int, default=400, help="fetches per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
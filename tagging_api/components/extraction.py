@@ -1,11 +1,16 @@
 import os
+import asyncio
 import sys
 import tempfile
 from utils.fetch_doc import fetch_s3_obj_key
-from configs.config import S3_OUTPUT_STORAGE, S3_BUCKET_NAME, META_COLLECTION_NAME
+from configs.config import S3_OUTPUT_STORAGE, S3_BUCKET_NAME, META_COLLECTION_NAME, EXTRACTION_TEXT_STORAGE, PAGE_TEXT_COLLECTION_NAME, PAGE_TEXT_ZSTD_LEVEL, EXTRACTION_TIERING, FAST_TIER_MIN_CHARS, FAST_TIER_MAX_IMAGE_COVERAGE, FAST_TIER_MIN_RUN, FAST_TIER_MAX_RUNS
 from services.s3_utils import S3DownloadObject, S3PutObject
+from services.page_store import PageTextStore
 from utils.lang_detection import language_detector
 from utils.metadata_extract import extract_metadata, extract_metadata_docling, get_overall_dpi
+from utils.pdf_scan import scan_pdf
+from utils.page_classifier import classify_pages
+from utils.converter_pool import conversion_executor, ExtractionOverloaded
 from loggers.logger import logging
 from db.crud import connect_db
 from loggers.exception import CustomException
@@ -13,6 +18,8 @@ from loggers.exception import CustomException
 
 async def document_extraction(user_id, doc_id):
     try:
+        # Fail fast before downloading anything when the conversion queue is already full
+        conversion_executor.check_capacity()
         obj_key = await fetch_s3_obj_key(user_id, doc_id)
         logging.info("Object key fetched from document id")
 
@@ -27,16 +34,24 @@ async def document_extraction(user_id, doc_id):
         S3DownloadObject(S3_BUCKET_NAME, obj_key, pdf_path)
         logging.info(f"Document downloaded in the pdf_path: {pdf_path}")
 
-        pymupdf_result = await extract_metadata(pdf_path)
+        # One PyMuPDF pass feeds font statistics, per-page language detection and image resolution
+        pdf_scan = await asyncio.to_thread(scan_pdf, pdf_path, language_detector.page_language)
+
+        pymupdf_result = await extract_metadata(pdf_path, pdf_scan)
         metadata['metadata'] = pymupdf_result
         logging.info("Metadata Extraction from PyMuPDF Success!!!")
 
-        language_dict = await language_detector.detect_languages(pdf_path=pdf_path)
+        language_dict = await language_detector.detect_languages(pdf_path=pdf_path, scan=pdf_scan)
         logging.info("Language Detection Success!!!")
 
         metadata['metadata']['language'] = language_dict['document_language']
 
-        docling_result = await extract_metadata_docling(pdf_path)
+        page_tiers = None
+        if EXTRACTION_TIERING:
+            # Text-native pages skip OCR and TableFormer; only scanned or image-heavy pages get the full pipeline
+            page_tiers = classify_pages(pdf_scan['page_stats'], FAST_TIER_MIN_CHARS,
+                                        FAST_TIER_MAX_IMAGE_COVERAGE, FAST_TIER_MIN_RUN, FAST_TIER_MAX_RUNS)
+        docling_result = await extract_metadata_docling(pdf_path, pdf_scan['page_count'], page_tiers)
         logging.info("Metadata Extraction from Docling Success!!!")
 
         metadata['metadata']['figure_count'] = docling_result['figure_count']
@@ -49,15 +64,34 @@ async def document_extraction(user_id, doc_id):
         metadata['metadata']['lines'] = docling_result['lines']
         metadata['metadata']['words'] = docling_result['words']
         metadata['metadata']['paragraphs'] = docling_result['paragraphs']
+        metadata['metadata']['extraction_tiers'] = docling_result['tiers']
         metadata['metadata']['font_style'] = pymupdf_result['font_style']
-        metadata['metadata']['resolution'] = await get_overall_dpi(pdf_path)
+        metadata['metadata']['resolution'] = await get_overall_dpi(pdf_path, pdf_scan)
         metadata['metadata']['color_space'] = "Hex"
         logging.info("Metadata Collected!!!")
 
+        page_texts = None
+        if EXTRACTION_TEXT_STORAGE == "paged":
+            page_store = PageTextStore(connect_db.db[PAGE_TEXT_COLLECTION_NAME], PAGE_TEXT_ZSTD_LEVEL)
+            page_texts = {page_key: page.pop("text", "") for page_key, page in metadata['pages'].items()}
+            full_text = metadata.pop('text')
+            S3PutObject(S3_BUCKET_NAME, f"{output_dir}/text.md.zst",
+                        page_store.compress(full_text), type_of_data='other')
+            metadata['text_storage'] = {
+                "mode": "paged",
+                "collection": PAGE_TEXT_COLLECTION_NAME,
+                "doc_id": doc_id,
+                "pages": len(page_texts)
+            }
+
         obj_key = f"{output_dir}/metadata.json"
         S3PutObject(S3_BUCKET_NAME, obj_key, metadata, type_of_data='json')
         logging.info("Metadata uploaded to S3.")
 
+        if page_texts is not None:
+            stats = await page_store.store(doc_id, page_texts)
+            logging.info(f"Page texts stored compressed: {stats['raw_bytes']} -> {stats['stored_bytes']} bytes")
+
         await connect_db.create_doc(META_COLLECTION_NAME, metadata)
         logging.info("Metadata stored in mongoDB")
 
@@ -66,6 +100,8 @@ async def document_extraction(user_id, doc_id):
 
         return metadata
 
+    except ExtractionOverloaded:
+        raise
     except Exception as e:
         raise CustomException(e, sys)
 
@@ -22,22 +22,75 @@ ALLOWED_IMAGE_TYPES = [
 ALLOWED_FILE_EXTENSIONS = ['.doc', '.docx', '.ppt', '.pptx']
 
 DB_CONNECTION_STRING = os.getenv("DB_CONNECTION_STRING")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None  # 0 means no socket timeout
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
 AWS_REGION = os.getenv("AWS_REGION")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 USER_COLLECTION_NAME = os.getenv("USER_COLLECTION_NAME")
+FETCH_DOCUMENTS_PAGE_SIZE = 100
 META_COLLECTION_NAME = os.getenv("META_COLLECTION_NAME")
+# "inline" keeps text and page texts in the metadata document, "paged" moves them to PAGE_TEXT_COLLECTION_NAME zstd-compressed
+EXTRACTION_TEXT_STORAGE = os.getenv("EXTRACTION_TEXT_STORAGE", "inline")
+PAGE_TEXT_COLLECTION_NAME = os.getenv("PAGE_TEXT_COLLECTION_NAME", f"{META_COLLECTION_NAME}_pages")
+PAGE_TEXT_ZSTD_LEVEL = int(os.getenv("PAGE_TEXT_ZSTD_LEVEL", "3"))
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 S3_FILE_STORAGE = "ContentEffectiveness/Uploaded_files"
 S3_OUTPUT_STORAGE = "ContentEffectiveness/Extracted_Content/"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "300000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
 FILE_EXPIRATION_TIME = 86400  # 24 hours
+DOCLING_WARMUP = os.getenv("DOCLING_WARMUP", "true").lower() == "true"
+DOCLING_WORKERS = int(os.getenv("DOCLING_WORKERS", "2"))  # 0 converts in a thread of the API process
+EXTRACTION_QUEUE_DEPTH = int(os.getenv("EXTRACTION_QUEUE_DEPTH", "4"))
+DOCLING_PAGE_RANGE_SIZE = int(os.getenv("DOCLING_PAGE_RANGE_SIZE", "0"))  # 0 converts every PDF in one piece
+DOCLING_SPLIT_MIN_PAGES = int(os.getenv("DOCLING_SPLIT_MIN_PAGES", "200"))
+EXTRACTION_TIERING = os.getenv("EXTRACTION_TIERING", "true").lower() == "true"
+FAST_TIER_MIN_CHARS = int(os.getenv("FAST_TIER_MIN_CHARS", "200"))
+FAST_TIER_MAX_IMAGE_COVERAGE = float(os.getenv("FAST_TIER_MAX_IMAGE_COVERAGE", "0.3"))
+FAST_TIER_MIN_RUN = int(os.getenv("FAST_TIER_MIN_RUN", "3"))
+FAST_TIER_MAX_RUNS = int(os.getenv("FAST_TIER_MAX_RUNS", "8"))  # more tier runs than this converts the PDF whole
 TAG_COLLECTION_NAME = os.getenv("TAG_COLLECTION_NAME")
+CHUNK_TOKENIZER_FILE = os.getenv("CHUNK_TOKENIZER_FILE")
+TAXONOMY_PREFILTER_TOP_K = int(os.getenv("TAXONOMY_PREFILTER_TOP_K", "0"))  # 0 sends the full taxonomy
+LLM_CACHE_COLLECTION_NAME = os.getenv("LLM_CACHE_COLLECTION_NAME")
+SINGLE_FLIGHT_COLLECTION_NAME = os.getenv("SINGLE_FLIGHT_COLLECTION_NAME")
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", "900"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))  # 7 days
 class Config:
     def __init__(self):
         self.openai_api_key = OPENAI_API_KEY
+        self.openai_base_url = OPENAI_BASE_URL
+        self.openai_rpm_limit = OPENAI_RPM_LIMIT
+        self.openai_tpm_limit = OPENAI_TPM_LIMIT
+        self.openai_max_concurrency = OPENAI_MAX_CONCURRENCY
         self.mongo_uri = DB_CONNECTION_STRING
+        self.mongo_max_pool_size = MONGO_MAX_POOL_SIZE
+        self.mongo_min_pool_size = MONGO_MIN_POOL_SIZE
+        self.mongo_max_idle_time_ms = MONGO_MAX_IDLE_TIME_MS
+        self.mongo_wait_queue_timeout_ms = MONGO_WAIT_QUEUE_TIMEOUT_MS
+        self.mongo_connect_timeout_ms = MONGO_CONNECT_TIMEOUT_MS
+        self.mongo_socket_timeout_ms = MONGO_SOCKET_TIMEOUT_MS
+        self.mongo_server_selection_timeout_ms = MONGO_SERVER_SELECTION_TIMEOUT_MS
         self.database_name = DATABASE_NAME
         self.collection_name = TAG_COLLECTION_NAME
+        self.page_text_collection_name = PAGE_TEXT_COLLECTION_NAME
+        self.page_text_zstd_level = PAGE_TEXT_ZSTD_LEVEL
+        self.chunk_tokenizer_file = CHUNK_TOKENIZER_FILE
+        self.taxonomy_prefilter_top_k = TAXONOMY_PREFILTER_TOP_K
+        self.llm_cache_collection_name = LLM_CACHE_COLLECTION_NAME
+        self.single_flight_collection_name = SINGLE_FLIGHT_COLLECTION_NAME
+        self.single_flight_lease_seconds = SINGLE_FLIGHT_LEASE_SECONDS
+        self.llm_cache_max_entries = LLM_CACHE_MAX_ENTRIES
+        self.llm_cache_ttl_seconds = LLM_CACHE_TTL_SECONDS
         
         if not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required. Please set it in your .env file or system environment variables.")
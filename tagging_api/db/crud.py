@@ -1,8 +1,7 @@
-import pymongo
 import sys
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure, PyMongoError
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from contextlib import contextmanager
 from bson import ObjectId
 from configs.config import DB_CONNECTION_STRING, DATABASE_NAME
@@ -11,7 +10,10 @@ from loggers.logger import logging
 from loggers.exception import CustomException
 
 class DBUtils:
-    """A class to handle CRUD operations for MongoDB with production-level features."""
+    """A class to handle CRUD operations for MongoDB with production-level features.
+
+    Built on Motor, so every operation awaits the database instead of blocking the event loop.
+    """
     
     def __init__(self):
         """
@@ -30,12 +32,24 @@ class DBUtils:
     def _connect(self) -> None:
         """Establish connection to MongoDB."""
         try:
-            self.client = MongoClient(self.connection_string)
+            self.client = AsyncIOMotorClient(self.connection_string)
             self.db = self.client[self.database_name]
 
         except ConnectionFailure as e:
             raise CustomException(e, sys)
 
+    def use_client(self, client: AsyncIOMotorClient) -> None:
+        """
+        Switch to a shared client so CRUD calls use the application's connection pool.
+        
+        Args:
+            client (AsyncIOMotorClient): Client owned and closed by the caller
+        """
+        if self.client is not None and self.client is not client:
+            self.client.close()
+        self.client = client
+        self.db = client[self.database_name]
+
     @contextmanager
     def _get_collection(self, collection_name: str):
         """Context manager for collection operations."""
@@ -66,7 +80,7 @@ class DBUtils:
             data['updation_time'] = None
             
             with self._get_collection(collection_name) as collection:
-                result = collection.insert_one(data)
+                result = await collection.insert_one(data)
                 logging.info("Document inserted in DB.")
                 return str(result.inserted_id)
         except PyMongoError as e:
@@ -89,7 +103,7 @@ class DBUtils:
                 cursor = collection.find(filter_criteria)
                 results = [
                     {**doc, '_id': str(doc['_id'])} 
-                    for doc in cursor
+                    async for doc in cursor
                 ]
                 logging.info("Document reading success...")
                 return results
@@ -97,6 +111,72 @@ class DBUtils:
             logging.info("Document reading failed.")
             raise e
 
+    async def iter_docs(self, collection_name: str, filter_criteria: Dict[str, Any],
+                        projection: Optional[List[str]] = None, after_id: Optional[str] = None,
+                        limit: int = 0, batch_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream documents in _id order straight from the server-side cursor.
+        
+        Args:
+            collection_name (str): Name of the collection
+            filter_criteria (Dict[str, Any]): Query filter
+            projection (Optional[List[str]]): Fields to return, all fields when None
+            after_id (Optional[str]): Keyset cursor, only documents with a greater _id are returned
+            limit (int): Maximum number of documents, 0 for no limit
+            batch_size (int): Documents fetched per round trip
+            
+        Yields:
+            Dict[str, Any]: Matching documents with _id as a string
+        """
+        query = dict(filter_criteria)
+        if after_id is not None:
+            query['_id'] = {'$gt': ObjectId(after_id)}
+        try:
+            with self._get_collection(collection_name) as collection:
+                cursor = collection.find(query, projection).sort('_id', 1).limit(limit).batch_size(batch_size)
+                async for doc in cursor:
+                    yield {**doc, '_id': str(doc['_id'])}
+        except PyMongoError as e:
+            logging.info("Document streaming failed.")
+            raise e
+
+    async def read_page(self, collection_name: str, filter_criteria: Dict[str, Any],
+                        projection: Optional[List[str]] = None, after_id: Optional[str] = None,
+                        limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Read one keyset page of documents in _id order.
+        
+        Args:
+            collection_name (str): Name of the collection
+            filter_criteria (Dict[str, Any]): Query filter
+            projection (Optional[List[str]]): Fields to return, all fields when None
+            after_id (Optional[str]): _id of the last document of the previous page
+            limit (int): Page size
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The page and the cursor for the next one, None on the last page
+        """
+        docs = [doc async for doc in self.iter_docs(collection_name, filter_criteria, projection,
+                                                    after_id, limit + 1, batch_size=limit + 1)]
+        if len(docs) > limit:
+            docs = docs[:limit]
+            return docs, docs[-1]['_id']
+        return docs, None
+
+    async def create_index(self, collection_name: str, keys: List[Tuple[str, int]], **kwargs) -> str:
+        """
+        Ensure an index exists on the specified collection.
+        
+        Args:
+            collection_name (str): Name of the collection
+            keys (List[Tuple[str, int]]): Index key specification
+            
+        Returns:
+            str: Name of the index
+        """
+        with self._get_collection(collection_name) as collection:
+            return await collection.create_index(keys, **kwargs)
+
     async def read_one(self, collection_name: str, filter_criteria: Dict) -> Optional[Dict[str, Any]]:
         """
         Read a single document by ID.
@@ -110,7 +190,7 @@ class DBUtils:
         """
         try:
             with self._get_collection(collection_name) as collection:
-                doc = collection.find_one(
+                doc = await collection.find_one(
                     filter_criteria)
                 if doc:
                     doc['_id'] = str(doc['_id'])
@@ -140,7 +220,7 @@ class DBUtils:
             update_data['creation_time'] = f"{datetime.now().time()}"
             update_data['updation_time'] = None
             with self._get_collection(collection_name) as collection:
-                result = collection.update_one(
+                result = await collection.update_one(
                     {'_id': ObjectId(document_id)},
                     {'$set': update_data}
                 )
@@ -166,7 +246,7 @@ class DBUtils:
         """
         try:
             with self._get_collection(collection_name) as collection:
-                result = collection.delete_one({'_id': ObjectId(document_id)})
+                result = await collection.delete_one({'_id': ObjectId(document_id)})
                 if result.deleted_count > 0:
                     logging.info(f"document deleted. doc_id: {document_id}")
                     return True
@@ -180,7 +260,7 @@ class DBUtils:
         """Close the MongoDB client connection."""
         if self.client:
             self.client.close()
-            self.logger.info("MongoDB connection closed")
+            logging.info("MongoDB connection closed")
             self.client = None
 
 connect_db = DBUtils()
\ No newline at end of file
@@ -0,0 +1,126 @@
+from typing import Dict
+import threading
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from configs.config import Config
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events per server so pool pressure can be inspected at runtime.
+
+    pymongo calls listeners from its own threads, so counters are updated under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict] = {}
+
+    def _pool(self, address) -> Dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "open_connections": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "total_wait_ms": 0.0,
+                "max_wait_ms": 0.0,
+                "connections_created": 0,
+                "connections_closed": 0,
+                "pool_cleared": 0
+            }
+        return pool
+
+    def _record_wait(self, pool: Dict, duration):
+        if duration is not None:
+            wait_ms = duration * 1000
+            pool["total_wait_ms"] += wait_ms
+            pool["max_wait_ms"] = max(pool["max_wait_ms"], wait_ms)
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["connections_created"] += 1
+            pool["open_connections"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["connections_closed"] += 1
+            pool["open_connections"] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checkout_failures"] += 1
+            self._record_wait(pool, getattr(event, "duration", None))
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checkouts"] += 1
+            pool["checked_out"] += 1
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            self._record_wait(pool, getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pool(event.address)["checked_out"] -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pools = {}
+            for address, pool in self._pools.items():
+                pools[address] = {
+                    **pool,
+                    "total_wait_ms": round(pool["total_wait_ms"], 3),
+                    "max_wait_ms": round(pool["max_wait_ms"], 3),
+                    "avg_wait_ms": round(pool["total_wait_ms"] / pool["checkouts"], 3) if pool["checkouts"] else 0.0
+                }
+            return pools
+
+def create_mongo_client(config: Config, pool_listener: PoolStatsListener) -> AsyncIOMotorClient:
+    """Build the process-wide Motor client with the configured pool, timeout and server selection settings"""
+    return AsyncIOMotorClient(
+        config.mongo_uri,
+        maxPoolSize=config.mongo_max_pool_size,
+        minPoolSize=config.mongo_min_pool_size,
+        maxIdleTimeMS=config.mongo_max_idle_time_ms,
+        waitQueueTimeoutMS=config.mongo_wait_queue_timeout_ms,
+        connectTimeoutMS=config.mongo_connect_timeout_ms,
+        socketTimeoutMS=config.mongo_socket_timeout_ms,
+        serverSelectionTimeoutMS=config.mongo_server_selection_timeout_ms,
+        event_listeners=[pool_listener]
+    )
+
+def pool_options(config: Config) -> Dict:
+    return {
+        "max_pool_size": config.mongo_max_pool_size,
+        "min_pool_size": config.mongo_min_pool_size,
+        "max_idle_time_ms": config.mongo_max_idle_time_ms,
+        "wait_queue_timeout_ms": config.mongo_wait_queue_timeout_ms,
+        "connect_timeout_ms": config.mongo_connect_timeout_ms,
+        "socket_timeout_ms": config.mongo_socket_timeout_ms,
+        "server_selection_timeout_ms": config.mongo_server_selection_timeout_ms
+    }
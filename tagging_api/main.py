@@ -1,9 +1,83 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from configs.config import AppInfo
+import asyncio
+from configs.config import AppInfo, get_config, USER_COLLECTION_NAME
 from fastapi.middleware.cors import CORSMiddleware
 from routes.upload_file import upload_router
 from routes.router import extraction_router
 from routes.tagging_routers import router as tagging_router
+from routes.diagnostics import diagnostics_router
+from services.taxonomy_index import TaxonomyIndex
+from services.tagging_service import TaggingService
+from services.llm_cache import LLMResultCache
+from utils.single_flight import SingleFlight, MongoLease
+from services.document_service import DocumentService
+from db.mongo import PoolStatsListener, create_mongo_client
+from db.crud import connect_db
+from utils.converter_pool import conversion_executor
+from loggers.logger import logging
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    config = get_config()
+    # Conversion workers load their models in the background; /health/ready reports when they are warm
+    conversion_executor.start()
+    conversion_warmup = asyncio.create_task(conversion_executor.wait_ready())
+    mongo_client = None
+    try:
+        taxonomy_index = TaxonomyIndex()
+        logging.info(f"Taxonomy index {taxonomy_index.version} built in {taxonomy_index.build_seconds:.3f}s")
+
+        mongo_pool_listener = PoolStatsListener()
+        mongo_client = create_mongo_client(config, mongo_pool_listener)
+        database = mongo_client[config.database_name]
+        connect_db.use_client(mongo_client)
+        try:
+            # Keyset pages of /fetch-documents filter on user_id and walk _id in order
+            await connect_db.create_index(USER_COLLECTION_NAME, [("user_id", 1), ("_id", 1)])
+        except Exception as e:
+            logging.warning(f"Could not ensure the user_id/_id index on {USER_COLLECTION_NAME}: {e}")
+
+        cache_collection = None
+        if config.llm_cache_collection_name:
+            cache_collection = database[config.llm_cache_collection_name]
+        llm_cache = LLMResultCache(config.llm_cache_max_entries, config.llm_cache_ttl_seconds, cache_collection)
+        try:
+            await llm_cache.ensure_indexes()
+        except Exception as e:
+            logging.warning(f"Could not ensure LLM cache indexes on {config.llm_cache_collection_name}: {e}")
+
+        lease = None
+        if config.single_flight_collection_name:
+            lease = MongoLease(database[config.single_flight_collection_name], config.single_flight_lease_seconds)
+            try:
+                await lease.ensure_indexes()
+            except Exception as e:
+                logging.warning(f"Could not ensure single-flight lease indexes on {config.single_flight_collection_name}: {e}")
+
+        document_service = DocumentService(config, mongo_client)
+        try:
+            await document_service.ensure_indexes()
+        except Exception as e:
+            logging.warning(f"Could not ensure document indexes on {config.collection_name}: {e}")
+
+        application.state.mongo_client = mongo_client
+        application.state.mongo_pool_listener = mongo_pool_listener
+        application.state.document_service = document_service
+        application.state.tagging_service = TaggingService(config, taxonomy_index, llm_cache)
+        application.state.single_flight = SingleFlight(lease)
+    except BaseException:
+        # Do not leave conversion workers or pool connections behind when startup fails
+        conversion_warmup.cancel()
+        conversion_executor.shutdown()
+        if mongo_client is not None:
+            mongo_client.close()
+        raise
+    yield
+    if not conversion_warmup.done():
+        conversion_warmup.cancel()
+    conversion_executor.shutdown()
+    mongo_client.close()
 
 def create_application() -> FastAPI:
     info = AppInfo()
@@ -12,7 +86,8 @@ def create_application() -> FastAPI:
         title=info.PROJECT_NAME,
         version=info.VERSION,
         description=info.DESCRIPTION,
-        openapi_url=f"{info.API_V1_STR}/vectoriser/openapi.json"
+        openapi_url=f"{info.API_V1_STR}/vectoriser/openapi.json",
+        lifespan=lifespan
     )
     
     application.add_middleware(
@@ -21,11 +96,13 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
     
     application.include_router(upload_router, prefix=info.API_V1_STR)
     application.include_router(extraction_router,prefix=info.API_V1_STR)
     application.include_router(tagging_router, prefix=info.API_V1_STR)
+    application.include_router(diagnostics_router, prefix=info.API_V1_STR)
     return application
 
 app = create_application()
\ No newline at end of file
@@ -1,7 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class FetchDoc(BaseModel):
     user_id: str
+    limit: Optional[int] = Field(
+        default=None, 
+        ge=1, 
+        le=1000, 
+        description="Page size; without limit or cursor every document is returned, otherwise pages default to 100"
+    )
+    cursor: Optional[str] = Field(
+        default=None, 
+        description="X-Next-Cursor value of the previous page"
+    )
+    fields: Optional[List[str]] = Field(
+        default=None, 
+        description="Fields to return; all fields when omitted"
+    )
+    stream: bool = Field(
+        default=False, 
+        description="Stream every matching document as NDJSON instead of returning one page"
+    )
 
 class DeleteDoc(BaseModel):
     doc_id: str
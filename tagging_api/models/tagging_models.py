@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
 class TaggingRequest(BaseModel):
     document_id: str
@@ -9,12 +9,28 @@ class TaggingRequest(BaseModel):
         le=10000, 
         description="Size of text chunks for processing"
     )
+    chunk_tokens: Optional[int] = Field(
+        default=None, 
+        ge=100, 
+        le=32000, 
+        description="Token budget per chunk; overrides chunk_size when set"
+    )
+    chunk_overlap_tokens: int = Field(
+        default=0, 
+        ge=0, 
+        le=2000, 
+        description="Tokens of trailing context repeated at the start of the next chunk"
+    )
     min_extractive_threshold: Optional[float] = Field(
         default=1.0, 
         ge=0.1, 
         le=50.0, 
         description="Minimum percentage score for extractive tags to be included"
     )
+    incremental: Optional[bool] = Field(
+        default=True, 
+        description="Reuse stored per-chunk results for chunks unchanged since the last tagging run"
+    )
 
 class TaggingResponse(BaseModel):
     document_id: str
@@ -22,4 +38,72 @@ class TaggingResponse(BaseModel):
     processing_time: float
     timestamp: str
     stored: bool
-    min_extractive_threshold_used: Optional[float] = None
\ No newline at end of file
+    min_extractive_threshold_used: Optional[float] = None
+    chunks_reused: Optional[int] = None
+    chunks_tagged: Optional[int] = None
+
+class BatchTaggingRequest(BaseModel):
+    document_ids: List[str] = Field(
+        min_length=1, 
+        max_length=1000, 
+        description="IDs of the documents to tag in one batch"
+    )
+    chunk_size: Optional[int] = Field(
+        default=5000, 
+        ge=100, 
+        le=10000, 
+        description="Size of text chunks for processing"
+    )
+    chunk_tokens: Optional[int] = Field(
+        default=None, 
+        ge=100, 
+        le=32000, 
+        description="Token budget per chunk; overrides chunk_size when set"
+    )
+    chunk_overlap_tokens: int = Field(
+        default=0, 
+        ge=0, 
+        le=2000, 
+        description="Tokens of trailing context repeated at the start of the next chunk"
+    )
+    min_extractive_threshold: Optional[float] = Field(
+        default=1.0, 
+        ge=0.1, 
+        le=50.0, 
+        description="Minimum percentage score for extractive tags to be included"
+    )
+
+class BatchDocumentResult(BaseModel):
+    document_id: str
+    tags: Optional[Dict[str, Any]] = None
+    chunks: int = 0
+    processing_time: float
+    stored: bool
+    error: Optional[str] = None
+
+class BatchTaggingResponse(BaseModel):
+    results: List[BatchDocumentResult]
+    processing_time: float
+    timestamp: str
+    min_extractive_threshold_used: Optional[float] = None
+
+class PrefilterReportRequest(BaseModel):
+    document_id: str
+    top_k: int = Field(
+        default=5, 
+        ge=1, 
+        le=50, 
+        description="Subtags per category described in the prefiltered prompt"
+    )
+    chunk_size: Optional[int] = Field(
+        default=5000, 
+        ge=100, 
+        le=10000, 
+        description="Size of text chunks for processing"
+    )
+    chunk_tokens: Optional[int] = Field(
+        default=None, 
+        ge=100, 
+        le=32000, 
+        description="Token budget per chunk; overrides chunk_size when set"
+    )
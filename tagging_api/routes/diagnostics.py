@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from configs.config import get_config
+from db.mongo import pool_options
+from utils.converter_pool import conversion_executor
+
+diagnostics_router = APIRouter(tags=["diagnostics"])
+
+@diagnostics_router.get("/diagnostics/mongo_pool")
+async def mongo_pool_diagnostics(request: Request):
+    """Connection pool settings and live per-server statistics of the shared Mongo client"""
+    return {
+        "options": pool_options(get_config()),
+        "pools": request.app.state.mongo_pool_listener.stats()
+    }
+
+@diagnostics_router.get("/health/ready")
+async def readiness():
+    """503 until the docling conversion workers have loaded their models, so traffic is only routed to warm instances"""
+    conversion = conversion_executor.status()
+    return JSONResponse(
+        status_code=200 if conversion["ready"] else 503,
+        content={"status": "ready" if conversion["ready"] else "warming", "conversion": conversion}
+    )
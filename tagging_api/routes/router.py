@@ -1,41 +1,55 @@
-from fastapi import APIRouter, HTTPException, status
+import json
+from fastapi import APIRouter, HTTPException, status, Depends
 from components.extraction import document_extraction
 from models.model import DocExtraction
+from routes.tagging_routers import get_single_flight
+from utils.single_flight import SingleFlight
+from utils.converter_pool import ExtractionOverloaded
 
 
 extraction_router = APIRouter()
 
-@extraction_router.post('/extraction')
-async def extract_document(request: DocExtraction):
-    try:
-        metadata = await document_extraction(request.user_id, request.doc_id)
+async def extract_response(request: DocExtraction):
+    metadata = await document_extraction(request.user_id, request.doc_id)
+
+    response = {
+        "page_count": metadata['metadata']['page_count'],
+        "paragraphs": metadata['metadata']['paragraphs'],
+        "words": metadata['metadata']['words'],
+        "font_style_count": metadata['metadata']['font_style_count'],
+        "figures_count": metadata['metadata']['figure_count'],
+        "table_count": metadata['metadata']['table_count'],
+        "title": metadata['metadata']['title'],
+        "author": metadata['metadata']['author'],
+        "creation_date": metadata['metadata']['creationDate'],
+        "filesize": metadata['metadata']['filesize'],
+        "file_format": metadata['metadata']['format'],
+        "creator": metadata['metadata']['creator'],
+        "producer": metadata['metadata']['producer'],
+        "language": metadata['metadata']['language'],
+        "resolution": metadata['metadata']['resolution'],
+        "color_space": metadata['metadata']['color_space'],
+        "encryption": metadata['metadata']['encryption'],
+        "font_distribution": metadata['metadata']['font_style'],
+        "color_distribution": metadata['metadata']['font_color'],
+        "summary": metadata['summary'],
+        "extraction_tiers": metadata['metadata']['extraction_tiers'],
+        "pages_review": metadata['pages']
+    }
 
-        response = {
-            "page_count": metadata['metadata']['page_count'],
-            "paragraphs": metadata['metadata']['paragraphs'],
-            "words": metadata['metadata']['words'],
-            "font_style_count": metadata['metadata']['font_style_count'],
-            "figures_count": metadata['metadata']['figure_count'],
-            "table_count": metadata['metadata']['table_count'],
-            "title": metadata['metadata']['title'],
-            "author": metadata['metadata']['author'],
-            "creation_date": metadata['metadata']['creationDate'],
-            "filesize": metadata['metadata']['filesize'],
-            "file_format": metadata['metadata']['format'],
-            "creator": metadata['metadata']['creator'],
-            "producer": metadata['metadata']['producer'],
-            "language": metadata['metadata']['language'],
-            "resolution": metadata['metadata']['resolution'],
-            "color_space": metadata['metadata']['color_space'],
-            "encryption": metadata['metadata']['encryption'],
-            "font_distribution": metadata['metadata']['font_style'],
-            "color_distribution": metadata['metadata']['font_color'],
-            "summary": metadata['summary'],
-            "pages_review": metadata['pages']
-        }
+    return response
 
-        return response
+@extraction_router.post('/extraction')
+async def extract_document(request: DocExtraction, single_flight: SingleFlight = Depends(get_single_flight)):
+    try:
+        # Concurrent requests for the same document share one download and docling run
+        flight_key = f"extraction:{json.dumps(request.model_dump(), sort_keys=True)}"
+        return await single_flight.do(flight_key, lambda: extract_response(request))
     except HTTPException:
         raise
+    except ExtractionOverloaded as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"Extraction capacity exhausted, retry later: {e}",
+                            headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Extraction failed: {str(e)}")
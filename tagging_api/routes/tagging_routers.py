@@ -1,29 +1,73 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from models.tagging_models import TaggingRequest, TaggingResponse
+import json
+from models.tagging_models import TaggingRequest, TaggingResponse, BatchTaggingRequest, BatchTaggingResponse, BatchDocumentResult, PrefilterReportRequest
 from services.tagging_service import TaggingService
 from services.document_service import DocumentService
-from configs.config import get_config
+from utils.single_flight import SingleFlight
 
 router = APIRouter(tags=["tagging"])
 
-def get_tagging_service() -> TaggingService:
-    config = get_config()
-    return TaggingService(config)
+def get_tagging_service(request: Request) -> TaggingService:
+    return request.app.state.tagging_service
 
-def get_document_service() -> DocumentService:
-    config = get_config()
-    return DocumentService(config)
+def get_single_flight(request: Request) -> SingleFlight:
+    return request.app.state.single_flight
+
+def get_document_service(request: Request) -> DocumentService:
+    return request.app.state.document_service
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/tagging/metrics")
+async def tagging_metrics(
+    tagging_service: TaggingService = Depends(get_tagging_service),
+    single_flight: SingleFlight = Depends(get_single_flight)
+):
+    """Expose build and runtime metrics of the shared tagging service"""
+    return {**tagging_service.metrics(), "single_flight": single_flight.stats()}
+
+@router.post("/tagging/prefilter_report")
+async def prefilter_report(
+    request: PrefilterReportRequest,
+    tagging_service: TaggingService = Depends(get_tagging_service),
+    document_service: DocumentService = Depends(get_document_service)
+):
+    """Compare prompt size, latency and tag recall of the BM25-prefiltered taxonomy against the full prompt"""
+    try:
+        text_content = await document_service.get_document_text(request.document_id)
+        if not text_content:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Document not found with ID: {request.document_id}"
+            )
+        report = await tagging_service.prefilter_report(
+            text_content, 
+            request.top_k, 
+            request.chunk_size, 
+            request.chunk_tokens
+        )
+        return {"document_id": request.document_id, **report}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/generate_tags", response_model=TaggingResponse)
 async def generate_tags(
     request: TaggingRequest,
     tagging_service: TaggingService = Depends(get_tagging_service),
-    document_service: DocumentService = Depends(get_document_service)
+    document_service: DocumentService = Depends(get_document_service),
+    single_flight: SingleFlight = Depends(get_single_flight)
 ):
     """Generate and store abstractive and extractive tags for a document"""
     start_time = datetime.now()
-    try:
+    
+    async def tag_and_store():
         text_content = await document_service.get_document_text(request.document_id)
         if not text_content:
             raise HTTPException(
@@ -31,22 +75,39 @@ async def generate_tags(
                 detail=f"Document not found with ID: {request.document_id}"
             )
         
-        tags = await tagging_service.tag_document(
+        previous_chunks = await document_service.get_tag_chunks(request.document_id) if request.incremental else None
+        tags, tag_chunks = await tagging_service.tag_document_incremental(
             text_content, 
+            previous_chunks,
             request.chunk_size, 
-            request.min_extractive_threshold
+            request.min_extractive_threshold,
+            request.chunk_tokens,
+            request.chunk_overlap_tokens
         )
         
-        stored = await document_service.store_tags_to_mongodb(request.document_id, tags)
+        stored = await document_service.store_tags_to_mongodb(request.document_id, tags, tag_chunks)
+        return {
+            "tags": tags, 
+            "stored": stored,
+            "chunks_reused": tag_chunks["reused"] if tag_chunks else 0,
+            "chunks_tagged": tag_chunks["tagged"] if tag_chunks else 0
+        }
+    
+    try:
+        # Identical concurrent requests share one run instead of tagging and storing the document twice
+        flight_key = f"generate_tags:{json.dumps(request.model_dump(), sort_keys=True)}"
+        outcome = await single_flight.do(flight_key, tag_and_store)
         processing_time = (datetime.now() - start_time).total_seconds()
         
         return TaggingResponse(
             document_id=request.document_id,
-            tags=tags,
+            tags=outcome["tags"],
             processing_time=processing_time,
             timestamp=datetime.now().isoformat(),
-            stored=stored,
-            min_extractive_threshold_used=request.min_extractive_threshold
+            stored=outcome["stored"],
+            min_extractive_threshold_used=request.min_extractive_threshold,
+            chunks_reused=outcome["chunks_reused"],
+            chunks_tagged=outcome["chunks_tagged"]
         )
         
     except HTTPException:
@@ -54,4 +115,109 @@ async def generate_tags(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/generate_tags/stream")
+async def generate_tags_stream(
+    request: TaggingRequest,
+    tagging_service: TaggingService = Depends(get_tagging_service),
+    document_service: DocumentService = Depends(get_document_service)
+):
+    """Stream tagging as server-sent events: extractive tags first, progress after every chunk, then the final TaggingResponse"""
+    start_time = datetime.now()
+    try:
+        text_content = await document_service.get_document_text(request.document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not text_content:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Document not found with ID: {request.document_id}"
+        )
+    
+    async def event_stream():
+        try:
+            async for event, payload in tagging_service.stream_tag_document(
+                text_content, 
+                request.chunk_size, 
+                request.min_extractive_threshold,
+                request.chunk_tokens,
+                request.chunk_overlap_tokens
+            ):
+                if event != "tags":
+                    yield format_sse(event, payload)
+                    continue
+                
+                stored = await document_service.store_tags_to_mongodb(request.document_id, payload)
+                processing_time = (datetime.now() - start_time).total_seconds()
+                response = TaggingResponse(
+                    document_id=request.document_id,
+                    tags=payload,
+                    processing_time=processing_time,
+                    timestamp=datetime.now().isoformat(),
+                    stored=stored,
+                    min_extractive_threshold_used=request.min_extractive_threshold
+                )
+                yield format_sse("result", response.model_dump())
+        except Exception as e:
+            yield format_sse("error", {"status_code": 500, "detail": f"Internal server error: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate_tags/batch", response_model=BatchTaggingResponse)
+async def generate_tags_batch(
+    request: BatchTaggingRequest,
+    tagging_service: TaggingService = Depends(get_tagging_service),
+    document_service: DocumentService = Depends(get_document_service)
+):
+    """Tag many documents with one fetch, one shared chunk queue and one bulk write"""
+    start_time = datetime.now()
+    try:
+        document_ids = list(dict.fromkeys(request.document_ids))
+        texts, errors = await document_service.get_documents_text(document_ids)
+        
+        outcomes = await tagging_service.tag_documents(
+            texts, 
+            request.chunk_size, 
+            request.min_extractive_threshold,
+            request.chunk_tokens,
+            request.chunk_overlap_tokens
+        )
+        
+        stored = await document_service.store_tags_bulk(
+            {document_id: outcome["tags"] for document_id, outcome in outcomes.items() if outcome["error"] is None}
+        )
+        
+        results = []
+        for document_id in document_ids:
+            outcome = outcomes.get(document_id)
+            if outcome is None:
+                results.append(BatchDocumentResult(
+                    document_id=document_id,
+                    processing_time=0.0,
+                    stored=False,
+                    error=errors.get(document_id)
+                ))
+                continue
+            results.append(BatchDocumentResult(
+                document_id=document_id,
+                tags=outcome["tags"],
+                chunks=outcome["chunks"],
+                processing_time=outcome["processing_time"],
+                stored=stored.get(document_id, False),
+                error=outcome["error"]
+            ))
+        
+        return BatchTaggingResponse(
+            results=results,
+            processing_time=(datetime.now() - start_time).total_seconds(),
+            timestamp=datetime.now().isoformat(),
+            min_extractive_threshold_used=request.min_extractive_threshold
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
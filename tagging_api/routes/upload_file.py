@@ -1,12 +1,15 @@
 import os
-from fastapi import APIRouter, Form, HTTPException, UploadFile, status, File
-from configs.config import ALLOWED_IMAGE_TYPES, S3_FILE_STORAGE,S3_BUCKET_NAME, USER_COLLECTION_NAME, ALLOWED_FILE_EXTENSIONS
+import json
+from fastapi import APIRouter, Form, HTTPException, UploadFile, status, File, Response
+from fastapi.responses import StreamingResponse
+from configs.config import ALLOWED_IMAGE_TYPES, S3_FILE_STORAGE,S3_BUCKET_NAME, USER_COLLECTION_NAME, ALLOWED_FILE_EXTENSIONS, FETCH_DOCUMENTS_PAGE_SIZE
 from services.s3_utils import S3PutObject, S3DeleteObject, S3UploadFile
 from db.crud import connect_db
 from bson import ObjectId
 from models.model import FetchDoc, DeleteDoc
 from utils.fetch_doc import generate_presigned_url
 from utils.file_upload import upload_doc_content
+from loggers.logger import logging
 
 
 upload_router = APIRouter()
@@ -45,13 +48,36 @@ async def document_upload(user_id : str = None, file: UploadFile = File(...)):
 
 
 @upload_router.post('/fetch-documents')
-async def fetch_all_doc(request: FetchDoc):
+async def fetch_all_doc(request: FetchDoc, response: Response):
+    if request.cursor is not None and not ObjectId.is_valid(request.cursor):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    filter_criteria = {"user_id": request.user_id}
     try:
-        docs = await connect_db.read_doc(collection_name=USER_COLLECTION_NAME,filter_criteria={"user_id":request.user_id})
+        if request.stream:
+            docs = connect_db.iter_docs(USER_COLLECTION_NAME, filter_criteria, request.fields,
+                                        request.cursor, request.limit or 0)
+            return StreamingResponse(ndjson_lines(docs), media_type="application/x-ndjson")
+
+        if request.limit is None and request.cursor is None:
+            # Unpaged callers keep getting every document, as before pagination was added
+            return [doc async for doc in connect_db.iter_docs(USER_COLLECTION_NAME, filter_criteria, request.fields)]
+
+        docs, next_cursor = await connect_db.read_page(USER_COLLECTION_NAME, filter_criteria, request.fields,
+                                                       request.cursor, request.limit or FETCH_DOCUMENTS_PAGE_SIZE)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
         return docs
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"S3 upload failed: {e}")
 
+async def ndjson_lines(docs):
+    """NDJSON body for a document stream; errors after the response has started can only be logged"""
+    try:
+        async for doc in docs:
+            yield json.dumps(doc, default=str) + "\n"
+    except Exception as e:
+        logging.error(f"Streaming documents failed: {e}")
+
 
 
 @upload_router.post('/delete-documents')
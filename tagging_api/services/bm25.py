@@ -0,0 +1,61 @@
+from typing import Dict, List, Tuple
+import re
+import math
+from collections import Counter
+
+class BM25:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+    
+    def tokenize(self, text: str) -> List[str]:
+        return [word.lower() for word in re.findall(r'\b\w+\b', text) if len(word) > 2]
+    
+    def compute_idf(self, documents: List[List[str]]) -> Dict[str, float]:
+        N = len(documents)
+        document_frequency = Counter()
+        for doc in documents:
+            document_frequency.update(set(doc))
+        return {word: math.log((N - containing_docs + 0.5) / (containing_docs + 0.5))
+                for word, containing_docs in document_frequency.items()}
+    
+    def score(self, query_tokens: List[str], document_tokens: List[str], 
+              avg_doc_len: float, idf: Dict[str, float]) -> float:
+        score = 0.0
+        doc_len = len(document_tokens)
+        doc_term_freq = Counter(document_tokens)
+        for term in query_tokens:
+            if term in doc_term_freq:
+                tf = doc_term_freq[term]
+                term_idf = idf.get(term, 0)
+                numerator = tf * (self.k1 + 1)
+                denominator = tf + self.k1 * (1 - self.b + self.b * (doc_len / avg_doc_len))
+                score += term_idf * (numerator / denominator)
+        return score
+
+class BM25Index:
+    """Inverted index over a fixed set of tag documents with precomputed BM25 term weights."""
+
+    def __init__(self, bm25: BM25, token_mapping: Dict[str, List[str]],
+                 idf: Dict[str, float], avg_doc_len: float):
+        self.names = list(token_mapping.keys())
+        self.postings: Dict[str, List[Tuple[str, float]]] = {}
+        for name, tokens in token_mapping.items():
+            doc_len = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_idf = idf.get(term, 0)
+                numerator = tf * (bm25.k1 + 1)
+                denominator = tf + bm25.k1 * (1 - bm25.b + bm25.b * (doc_len / avg_doc_len))
+                self.postings.setdefault(term, []).append((name, term_idf * (numerator / denominator)))
+        self.max_weight = max((weight for hits in self.postings.values() for _, weight in hits), default=0.0)
+
+    def score(self, query_tokens: List[str]) -> Dict[str, float]:
+        """Score only the tags sharing terms with the query, in the same order BM25.score accumulates."""
+        scores = {}
+        postings = self.postings
+        for term in query_tokens:
+            hits = postings.get(term)
+            if hits:
+                for name, weight in hits:
+                    scores[name] = scores.get(name, 0.0) + weight
+        return {name: scores[name] for name in self.names if name in scores}
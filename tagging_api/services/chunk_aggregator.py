@@ -0,0 +1,95 @@
+from typing import Dict, List, Optional, Tuple
+
+ABSTRACTIVE_CATEGORIES = ["audience", "content purpose", "content complexity", "non clinical topics", "clinical topic"]
+MIN_TAG_CONFIDENCE = 0.3
+
+class ChunkResultAggregator:
+    """Per-tag score entries collected from chunk results one at a time, as chunks complete.
+
+    Only the (chunk index, position, score) of each qualifying tag is kept, not the results
+    themselves. Entries are put back in chunk order before summing, so floats are added in
+    the same order as walking the full list of chunk results and the outcome is identical
+    whatever order chunks finish in.
+    """
+
+    def __init__(self):
+        self.total_chunks = 0
+        self.tag_stats: Dict[str, Dict[str, List[Tuple[int, int, float]]]] = {category: {} for category in ABSTRACTIVE_CATEGORIES}
+        self.topic_scores: Dict[str, List[Tuple[int, int, float]]] = {"clinical topic": [], "non clinical topics": []}
+        self.topic_chunk_counts = {"clinical topic": 0, "non clinical topics": 0}
+
+    def add(self, result: Dict, chunk_index: Optional[int] = None):
+        if chunk_index is None:
+            chunk_index = self.total_chunks
+        self.total_chunks += 1
+        if not isinstance(result, dict) or "abstractive" not in result:
+            return
+
+        abstractive = result["abstractive"]
+        for category, stats in self.tag_stats.items():
+            if category in abstractive:
+                for position, (tag, score) in enumerate(abstractive[category].items()):
+                    if score >= MIN_TAG_CONFIDENCE:
+                        stats.setdefault(tag, []).append((chunk_index, position, score))
+
+        for topic, entries in self.topic_scores.items():
+            topic_tags = abstractive.get(topic, {})
+            if topic_tags:
+                self.topic_chunk_counts[topic] += 1
+            for position, score in enumerate(topic_tags.values()):
+                if isinstance(score, (int, float)) and score >= MIN_TAG_CONFIDENCE:
+                    entries.append((chunk_index, position, score))
+
+    def category_scores(self, category: str) -> Dict[str, float]:
+        """Frequency-weighted average confidence per tag, normalized to percentages"""
+        category_tags = {}
+        ordered_stats = sorted((sorted(entries), tag) for tag, entries in self.tag_stats[category].items())
+        for entries, tag in ordered_stats:
+            scores = [score for _, _, score in entries]
+            avg_score = sum(scores) / len(scores)
+            frequency_weight = len(scores) / self.total_chunks
+            category_tags[tag] = avg_score * frequency_weight
+
+        if category_tags:
+            total_raw_score = sum(category_tags.values())
+            if total_raw_score > 0:
+                for tag in category_tags:
+                    normalized_score = (category_tags[tag] / total_raw_score) * 100
+                    category_tags[tag] = round(normalized_score, 1)
+        return category_tags
+
+    def content_distribution(self) -> Dict[str, float]:
+        def weighted(topic):
+            scores = [score for _, _, score in sorted(self.topic_scores[topic])]
+            avg_confidence = sum(scores) / len(scores) if scores else 0.0
+            frequency = self.topic_chunk_counts[topic] / self.total_chunks if self.total_chunks > 0 else 0
+            return avg_confidence * frequency
+
+        clinical_weighted = weighted("clinical topic")
+        non_clinical_weighted = weighted("non clinical topics")
+
+        total_weighted = clinical_weighted + non_clinical_weighted
+
+        if total_weighted == 0:
+            return {
+                "clinical": 0.0,
+                "non_clinical": 0.0
+            }
+
+        clinical_percentage = round((clinical_weighted / total_weighted) * 100, 1)
+        non_clinical_percentage = round((non_clinical_weighted / total_weighted) * 100, 1)
+
+        if clinical_percentage + non_clinical_percentage != 100.0:
+            diff = 100.0 - (clinical_percentage + non_clinical_percentage)
+            if abs(diff) <= 0.1:
+                if clinical_percentage >= non_clinical_percentage:
+                    clinical_percentage += diff
+                else:
+                    non_clinical_percentage += diff
+            clinical_percentage = max(0.0, round(clinical_percentage, 1))
+            non_clinical_percentage = max(0.0, round(non_clinical_percentage, 1))
+
+        return {
+            "clinical": clinical_percentage,
+            "non_clinical": non_clinical_percentage
+        }
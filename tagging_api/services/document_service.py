@@ -1,16 +1,21 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from bson import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from configs.config import Config
+from services.page_store import PageTextStore
+from loggers.logger import logging
 
 class DocumentService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, mongo_client: Optional[AsyncIOMotorClient] = None):
         self.config = config
-        self.mongo_client = AsyncIOMotorClient(config.mongo_uri)
+        self.mongo_client = mongo_client or AsyncIOMotorClient(config.mongo_uri)
         self.db = self.mongo_client[config.database_name]
         self.collection = self.db[config.collection_name]
+        self.page_store = PageTextStore(self.db[config.page_text_collection_name], config.page_text_zstd_level)
     
     def convert_to_object_id(self, document_id: str):
         """Convert string ID to ObjectId if it's a valid ObjectId format, otherwise return as string"""
@@ -19,48 +24,44 @@ class DocumentService:
         except InvalidId:
             return document_id
 
-    async def find_document_by_id(self, document_id: str):
-        """Find document by ID, trying both ObjectId and string formats"""
-        try:
-            obj_id = ObjectId(document_id)
-            document = await self.collection.find_one({"_id": obj_id})
-            if document:
-                return document
-        except InvalidId:
-            pass
-        # Try searching by a custom document_id field if it exists
-        document = await self.collection.find_one({"doc_id": document_id})
-        if document:
-            return document
-        return None
+    async def ensure_indexes(self):
+        """Index the doc_id fallback and the generated tag fields so lookups and tag queries avoid collection scans"""
+        await self.collection.create_index("doc_id")
+        await self.collection.create_index("tags_updated_at")
+        await self.collection.create_index([("generated_tags.$**", 1)])
+        await self.page_store.ensure_indexes()
 
-    async def store_tags_to_mongodb(self, document_id: str, tags: Dict):
-        """Store the generated tags back to MongoDB"""
+    async def find_document_by_id(self, document_id: str, projection: Optional[Dict] = None):
+        """Find document by ObjectId or custom doc_id in one round trip, preferring the _id match"""
+        documents = await self.collection.find(self._id_filter(document_id), projection).limit(2).to_list(2)
+        if not documents:
+            return None
+        if ObjectId.is_valid(document_id):
+            for document in documents:
+                if document["_id"] == ObjectId(document_id):
+                    return document
+        return documents[0]
+
+    async def store_tags_to_mongodb(self, document_id: str, tags: Dict, tag_chunks: Optional[Dict] = None):
+        """Store the generated tags back to MongoDB, with the per-chunk results when given"""
         try:
             update_data = {
                 "generated_tags": tags,
                 "tags_generated_at": datetime.now().isoformat(),
                 "tags_updated_at": datetime.now().isoformat()
             }
+            if tag_chunks is not None:
+                update_data["tag_chunks"] = tag_chunks
             
-            try:
-                obj_id = ObjectId(document_id)
-                result = await self.collection.update_one(
-                    {"_id": obj_id}, 
-                    {"$set": update_data}
-                )
-                if result.matched_count > 0:
-                    return True
-            except InvalidId:
-                pass
-            # Try with document_id field
+            # Resolve the _id first so the write lands on the same document reads prefer
+            document = await self.find_document_by_id(document_id, {"_id": 1})
+            if not document:
+                return False
             result = await self.collection.update_one(
-                {"doc_id": document_id}, 
+                {"_id": document["_id"]}, 
                 {"$set": update_data}
             )
-            if result.matched_count > 0:
-                return True
-            return False
+            return result.matched_count > 0
             
         except Exception as e:
             print(f"[ERROR] Failed to store tags to MongoDB: {str(e)}")
@@ -68,12 +69,16 @@ class DocumentService:
     
     async def get_document_text(self, document_id: str) -> Optional[str]:
         """Get text content from document"""
-        document = await self.find_document_by_id(document_id)
+        document = await self.find_document_by_id(document_id, {"text": 1, "text_storage": 1})
         
         if not document:
             return None
         
+        if "text" not in document and self._is_paged(document):
+            return await self.page_store.read_text(document["text_storage"]["doc_id"])
+        
         if "text" not in document:
+            document = await self.find_document_by_id(document_id) or document
             raise ValueError(f"text field not found in document. Available fields: {list(document.keys())}")
         
         text_content = document["text"]
@@ -84,4 +89,94 @@ class DocumentService:
         if not text_content.strip():
             raise ValueError("text field is empty")
         
-        return text_content
\ No newline at end of file
+        return text_content
+
+    def _is_paged(self, document: Dict) -> bool:
+        return isinstance(document.get("text_storage"), dict) and document["text_storage"].get("mode") == "paged"
+
+    async def get_tag_chunks(self, document_id: str) -> Optional[Dict]:
+        """Per-chunk hashes and results stored by the previous tagging run, if any"""
+        document = await self.find_document_by_id(document_id, {"tag_chunks": 1})
+        return document.get("tag_chunks") if document else None
+
+    def _id_filter(self, document_id: str) -> Dict:
+        """Match a document by ObjectId or by the custom doc_id field in a single query"""
+        if ObjectId.is_valid(document_id):
+            return {"$or": [{"_id": ObjectId(document_id)}, {"doc_id": document_id}]}
+        return {"doc_id": document_id}
+
+    async def _resolve_documents(self, document_ids: List[str], projection: Dict) -> Dict[str, Dict]:
+        """Map each requested ID to its document with one query, preferring the _id match as find_document_by_id does"""
+        object_ids = {ObjectId(document_id): document_id for document_id in document_ids if ObjectId.is_valid(document_id)}
+        requested = set(document_ids)
+        query = {"$or": [{"_id": {"$in": list(object_ids)}}, {"doc_id": {"$in": list(requested)}}]}
+
+        by_object_id = {}
+        by_doc_id = {}
+        async for document in self.collection.find(query, {**projection, "doc_id": 1}):
+            if document["_id"] in object_ids:
+                by_object_id[object_ids[document["_id"]]] = document
+            doc_id = document.get("doc_id")
+            if isinstance(doc_id, str) and doc_id in requested:
+                by_doc_id.setdefault(doc_id, document)
+
+        resolved = {}
+        for document_id in document_ids:
+            document = by_object_id.get(document_id) or by_doc_id.get(document_id)
+            if document is not None:
+                resolved[document_id] = document
+        return resolved
+
+    async def get_documents_text(self, document_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Fetch text for many documents with one query; returns (texts, errors) keyed by requested ID"""
+        documents = await self._resolve_documents(document_ids, {"text": 1, "text_storage": 1})
+
+        texts = {}
+        errors = {}
+        for document_id in document_ids:
+            document = documents.get(document_id)
+            if document is None:
+                errors[document_id] = f"Document not found with ID: {document_id}"
+                continue
+            text_content = document.get("text")
+            if text_content is None and self._is_paged(document):
+                text_content = await self.page_store.read_text(document["text_storage"]["doc_id"])
+            if not isinstance(text_content, str) or not text_content.strip():
+                errors[document_id] = "text field is missing, empty or not a string"
+                continue
+            texts[document_id] = text_content
+        return texts, errors
+
+    async def store_tags_bulk(self, tags_by_id: Dict[str, Dict]) -> Dict[str, bool]:
+        """Store generated tags for many documents with a single unordered bulk write, by the _id each requested ID resolves to"""
+        if not tags_by_id:
+            return {}
+        document_ids = list(tags_by_id.keys())
+        now = datetime.now().isoformat()
+        try:
+            documents = await self._resolve_documents(document_ids, {"_id": 1})
+        except Exception as e:
+            logging.error(f"Failed to bulk store tags to MongoDB: {str(e)}")
+            return {document_id: False for document_id in document_ids}
+
+        stored = {document_id: document_id in documents for document_id in document_ids}
+        written_ids = [document_id for document_id in document_ids if document_id in documents]
+        operations = [
+            UpdateOne({"_id": documents[document_id]["_id"]}, {"$set": {
+                "generated_tags": tags_by_id[document_id],
+                "tags_generated_at": now,
+                "tags_updated_at": now
+            }})
+            for document_id in written_ids
+        ]
+        if not operations:
+            return stored
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                stored[written_ids[write_error["index"]]] = False
+        except Exception as e:
+            logging.error(f"Failed to bulk store tags to MongoDB: {str(e)}")
+            return {document_id: False for document_id in document_ids}
+        return stored
@@ -0,0 +1,93 @@
+from typing import Dict, Optional
+import copy
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from loggers.logger import logging
+
+def llm_cache_key(chunk: str, model: str, prompt_version: str, taxonomy_version: str) -> str:
+    payload = json.dumps([chunk, model, prompt_version, taxonomy_version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMResultCache:
+    """Content-addressed cache of validated chunk results.
+
+    The in-memory tier is an LRU bounded by entry count and TTL. When a Mongo collection
+    is given, entries are also written there with an `expires_at` TTL index, so results
+    survive restarts and are shared between workers.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 604800, collection=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def _remember(self, key: str, value: Dict, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                document = await self.collection.find_one({"_id": key}, {"result": 1, "expires_at": 1})
+            except Exception as e:
+                logging.warning(f"LLM cache lookup failed: {e}")
+                document = None
+            if document:
+                expires_at = document["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+                if expires_at > time.time():
+                    self._remember(key, document["result"], expires_at)
+                    self.persistent_hits += 1
+                    return copy.deepcopy(document["result"])
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict):
+        self._remember(key, copy.deepcopy(value), time.time() + self.ttl_seconds)
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {"_id": key},
+                    {"$set": {"result": value,
+                              "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)}},
+                    upsert=True
+                )
+            except Exception as e:
+                logging.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.memory_hits + self.persistent_hits) / lookups, 3) if lookups else 0.0,
+            "persistent": self.collection is not None
+        }
@@ -0,0 +1,64 @@
+from typing import AsyncIterator, Dict, Optional
+import re
+import zstandard
+from bson import Binary
+
+_PAGE_KEY = re.compile(r'page_(\d+)$')
+
+class PageTextStore:
+    """Per-page extracted text kept zstd-compressed in its own collection, one document per page.
+
+    Keeps large extractions well under the 16 MB document limit and lets readers fetch a
+    single page, or stream pages in order, without loading the whole text.
+    """
+
+    def __init__(self, collection, level: int = 3):
+        self.collection = collection
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("doc_id", 1), ("page_no", 1)], unique=True)
+
+    def compress(self, text: str) -> Binary:
+        return Binary(self._compressor.compress(text.encode('utf-8')))
+
+    def decompress(self, data: bytes) -> str:
+        return self._decompressor.decompress(data).decode('utf-8')
+
+    async def store(self, doc_id: str, page_texts: Dict[str, str]) -> Dict:
+        """Replace the stored pages of a document; page_texts is keyed like the extraction output ("page_1", ...)"""
+        pages = []
+        raw_bytes = 0
+        stored_bytes = 0
+        for page_key, text in page_texts.items():
+            match = _PAGE_KEY.match(page_key)
+            compressed = self.compress(text)
+            raw_bytes += len(text.encode('utf-8'))
+            stored_bytes += len(compressed)
+            pages.append({
+                "doc_id": doc_id,
+                "page_no": int(match.group(1)) if match else len(pages) + 1,
+                "page_key": page_key,
+                "chars": len(text),
+                "text_zstd": compressed
+            })
+
+        await self.collection.delete_many({"doc_id": doc_id})
+        if pages:
+            await self.collection.insert_many(pages, ordered=False)
+        return {"pages": len(pages), "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+    async def get_page_text(self, doc_id: str, page_no: int) -> Optional[str]:
+        page = await self.collection.find_one({"doc_id": doc_id, "page_no": page_no}, {"text_zstd": 1})
+        return self.decompress(page["text_zstd"]) if page else None
+
+    async def iter_page_texts(self, doc_id: str, batch_size: int = 8) -> AsyncIterator[str]:
+        """Yield page texts in page order, fetching and decompressing a few pages at a time"""
+        cursor = self.collection.find({"doc_id": doc_id}, {"text_zstd": 1}).sort("page_no", 1).batch_size(batch_size)
+        async for page in cursor:
+            yield self.decompress(page["text_zstd"])
+
+    async def read_text(self, doc_id: str) -> str:
+        """Whole document text, with pages joined by blank lines as in the markdown export"""
+        return "\n\n".join([text async for text in self.iter_page_texts(doc_id)])
@@ -0,0 +1,90 @@
+from typing import Dict, Hashable, Iterable, List, Tuple
+import re
+from collections import Counter, deque
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_phrase(text: str) -> str:
+    return _WHITESPACE.sub(' ', text.lower()).strip()
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that counts whole-word phrase occurrences in a single pass over the text."""
+
+    def __init__(self, phrases: Iterable[Tuple[str, Hashable]], min_ascii_length: int = 3):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Tuple[Hashable, ...]]]] = [[]]
+        self._labels: Dict[str, set] = {}
+        for phrase, label in phrases:
+            if not isinstance(phrase, str):
+                continue
+            normalized = normalize_phrase(phrase)
+            if not normalized or (len(normalized) < min_ascii_length and normalized.isascii()):
+                continue
+            self._labels.setdefault(normalized, set()).add(label)
+        for normalized, labels in self._labels.items():
+            self._add(normalized, tuple(labels))
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _add(self, phrase: str, labels: Tuple[Hashable, ...]):
+        state = 0
+        for ch in phrase:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(phrase), labels))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, Tuple[Hashable, ...]]]:
+        """Return leftmost-longest, non-overlapping whole-word matches as (start, end, labels)."""
+        normalized = normalize_phrase(text)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        candidates = []
+        state = 0
+        for position, ch in enumerate(normalized):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, labels in outputs[state]:
+                start = position - length + 1
+                end = position + 1
+                if start > 0 and normalized[start].isalnum() and normalized[start - 1].isalnum():
+                    continue
+                if end < len(normalized) and normalized[position].isalnum() and normalized[end].isalnum():
+                    continue
+                candidates.append((start, end, labels))
+
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        matches = []
+        covered_until = 0
+        for start, end, labels in candidates:
+            if start >= covered_until:
+                matches.append((start, end, labels))
+                covered_until = end
+        return matches
+
+    def count(self, text: str) -> Counter:
+        hits = Counter()
+        for _, _, labels in self.find(text):
+            hits.update(labels)
+        return hits
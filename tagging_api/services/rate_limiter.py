@@ -0,0 +1,141 @@
+from typing import Dict, Optional
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+CHARS_PER_TOKEN = 4
+DEFAULT_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After / retry-after-ms from the response attached to an OpenAI error"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+class TokenBucket:
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.available >= needed:
+            return 0.0
+        return (needed - self.available) / self.rate
+
+    def consume(self, amount: float):
+        # May go negative: requests larger than the bucket and usage corrections are paid back over time
+        self._refill()
+        self.available -= amount
+
+class AdaptiveRateLimiter:
+    """Process-wide admission control for LLM calls.
+
+    Requests and tokens per minute are enforced with token buckets. The number of
+    concurrent calls follows AIMD: it grows by one per window of successful calls and
+    is halved, with a pause honouring Retry-After, whenever the provider answers 429.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 max_concurrency: int, initial_concurrency: int = 4):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = float(min(initial_concurrency, self.max_concurrency))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.rate_limited_count = 0
+        self.completed_count = 0
+        self._consecutive_backoffs = 0
+        self._admission = asyncio.Lock()
+        self._slot_released = asyncio.Event()
+
+    def _delay(self, tokens: int) -> float:
+        return max(self.paused_until - time.monotonic(),
+                   self.requests.wait_time(1),
+                   self.tokens.wait_time(tokens))
+
+    async def acquire(self, tokens: int):
+        # Nothing is reserved until the final, await-free step, so a caller cancelled while
+        # waiting leaves no trace; the lock is released by the context manager either way.
+        async with self._admission:
+            while True:
+                delay = self._delay(tokens)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                if self.in_flight >= int(self.concurrency_limit):
+                    self._slot_released.clear()
+                    await self._slot_released.wait()
+                    continue
+                break
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.in_flight += 1
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        """Hold a concurrency slot for one call; set "used_tokens" and "success" on the yielded outcome.
+
+        The slot is released when the block exits for any reason, cancellation included.
+        """
+        await self.acquire(tokens)
+        outcome = {"used_tokens": None, "success": False}
+        try:
+            yield outcome
+        finally:
+            self.release(tokens, outcome["used_tokens"], outcome["success"])
+
+    def release(self, estimated_tokens: int, used_tokens: Optional[int] = None, success: bool = True):
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.consume(used_tokens - estimated_tokens)
+        if success:
+            self.completed_count += 1
+            self._consecutive_backoffs = 0
+            self.concurrency_limit = min(self.max_concurrency,
+                                         self.concurrency_limit + 1 / self.concurrency_limit)
+        self._slot_released.set()
+
+    def backoff(self, retry_after: Optional[float] = None) -> float:
+        """Halve the concurrency limit and pause admissions after a 429; returns the pause length"""
+        self.rate_limited_count += 1
+        self._consecutive_backoffs += 1
+        self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+        if retry_after is None:
+            retry_after = min(MAX_BACKOFF_SECONDS,
+                              DEFAULT_BACKOFF_SECONDS * 2 ** (self._consecutive_backoffs - 1))
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self.in_flight,
+            "completed": self.completed_count,
+            "rate_limited": self.rate_limited_count,
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "requests_per_minute": int(self.requests.capacity),
+            "tokens_per_minute": int(self.tokens.capacity)
+        }
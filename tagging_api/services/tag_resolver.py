@@ -0,0 +1,56 @@
+from typing import Dict, Optional
+import unicodedata
+
+def fold_tag(tag: str) -> str:
+    """Casefold, strip accents and collapse whitespace so near-identical spellings compare equal"""
+    decomposed = unicodedata.normalize('NFKD', tag)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+class TagResolver:
+    """Maps tag names or synonyms returned by the LLM to canonical abstractive tags with dict lookups only.
+
+    Lookups follow the precedence of the original linear validation: exact subtag name,
+    subtag synonym, exact nested subtag name, nested synonym, case-insensitive name, and
+    finally an accent/case-folded match over names and synonyms.
+    """
+
+    def __init__(self, parsed_abs_tags: Dict):
+        self._categories = {}
+        for category_name, category_info in parsed_abs_tags.items():
+            subtags = {}
+            synonyms = {}
+            nested = {}
+            nested_synonyms = {}
+            for subtag_name, subtag_info in category_info['subtags'].items():
+                subtags[subtag_name] = subtag_name
+                for synonym in subtag_info.get('synonyms', []):
+                    synonyms[synonym.lower()] = subtag_name
+                for nested_name, nested_info in subtag_info.get('nested_subtags', {}).items():
+                    nested[nested_name] = nested_name
+                    for synonym in nested_info.get('synonyms', []):
+                        nested_synonyms[synonym.lower()] = nested_name
+
+            lowered = {}
+            for name in list(subtags) + list(nested):
+                lowered.setdefault(name.lower(), name)
+
+            folded = {}
+            for mapping in (subtags, synonyms, nested, nested_synonyms):
+                for key, name in mapping.items():
+                    folded.setdefault(fold_tag(key), name)
+
+            self._categories[category_name] = (subtags, synonyms, nested, nested_synonyms, lowered, folded)
+
+    def resolve(self, category: str, tag: str) -> Optional[str]:
+        maps = self._categories.get(category)
+        if maps is None:
+            return None
+        subtags, synonyms, nested, nested_synonyms, lowered, folded = maps
+        lower_tag = tag.lower()
+        return (subtags.get(tag)
+                or synonyms.get(lower_tag)
+                or nested.get(tag)
+                or nested_synonyms.get(lower_tag)
+                or lowered.get(lower_tag)
+                or folded.get(fold_tag(tag)))
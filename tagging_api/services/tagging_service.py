@@ -1,128 +1,98 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import json
-import asyncio
-import re
 import math
-from collections import Counter
-from openai import AsyncOpenAI
+import time
+import asyncio
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
 from configs.config import Config
+from services.bm25 import BM25Index
+from services.chunk_aggregator import ChunkResultAggregator, ABSTRACTIVE_CATEGORIES
+from services.llm_cache import LLMResultCache, llm_cache_key
+from services.rate_limiter import AdaptiveRateLimiter, estimate_tokens, retry_after_seconds, CHARS_PER_TOKEN
+from services.taxonomy_index import TaxonomyIndex
+from utils.text_chunker import TextChunker, character_chunk_count, load_token_counter, text_hash
 
-class BM25:
-    def __init__(self, k1=1.5, b=0.75):
-        self.k1 = k1
-        self.b = b
-    
-    def tokenize(self, text: str) -> List[str]:
-        return [word.lower() for word in re.findall(r'\b\w+\b', text) if len(word) > 2]
-    
-    def compute_idf(self, documents: List[List[str]]) -> Dict[str, float]:
-        N = len(documents)
-        idf = {}
-        all_words = set(word for doc in documents for word in doc)
-        for word in all_words:
-            containing_docs = sum(1 for doc in documents if word in doc)
-            idf[word] = math.log((N - containing_docs + 0.5) / (containing_docs + 0.5))
-        return idf
-    
-    def score(self, query_tokens: List[str], document_tokens: List[str], 
-              avg_doc_len: float, idf: Dict[str, float]) -> float:
-        score = 0.0
-        doc_len = len(document_tokens)
-        doc_term_freq = Counter(document_tokens)
-        for term in query_tokens:
-            if term in doc_term_freq:
-                tf = doc_term_freq[term]
-                term_idf = idf.get(term, 0)
-                numerator = tf * (self.k1 + 1)
-                denominator = tf + self.k1 * (1 - self.b + self.b * (doc_len / avg_doc_len))
-                score += term_idf * (numerator / denominator)
-        return score
+PHRASE_MATCH_WEIGHT = 1.0
+# Growth step when calibrating a character budget against the original splitter's chunk count
+CHUNK_BUDGET_STEP = 1.05
+# Everything before the chunk is static per taxonomy version, so the rendered prefix is
+# byte-identical across calls and eligible for provider-side prompt caching.
+ABSTRACTIVE_PROMPT_PREFIX_TEMPLATE = """You are an expert content analyzer. Analyze the provided text content and identify relevant abstractive tags from the given categories. You must select ONLY the specific subtags provided in the available options, not generic terms.
+
+Available Categories and Subtags:
+{categories_info}
+
+Important Rules:
+1. ONLY use the exact subtag names provided in the categories above
+2. You can also use synonyms of the subtags if they appear in the content
+3. Multiple subtags can be selected from each category if relevant
+4. Confidence scores should be between 0.0 and 1.0
+5. Only select subtags you are highly confident about (>= 0.3)
+6. If no specific subtags are relevant, return empty objects for that category
+7. Look for exact matches, synonym matches, and conceptual matches based on definitions
+8. Pay attention to the context and meaning of the content when selecting tags
+9. For parent tags with nested subtags (like Treatment), identify both the parent and relevant nested subtags
+10. Score nested subtags separately from their parent tags
+
+Output Format:
+Return ONLY a valid JSON object with this exact structure:
+{{
+    "abstractive": {{
+        "audience": {{"exact_subtag_name_or_synonym": confidence_score}},
+        "content purpose": {{"exact_subtag_name_or_synonym": confidence_score}},
+        "content complexity": {{"exact_subtag_name_or_synonym": confidence_score}},
+        "non clinical topics": {{"exact_subtag_name_or_synonym": confidence_score}},
+        "clinical topic": {{"exact_subtag_name_or_synonym": confidence_score}}
+    }}
+}}
+
+Text Content to Analyze:
+"""
+MAX_LLM_RETRIES = 5
+# Bump whenever the tag_chunk prompt changes so cached results are not reused across prompts
+PROMPT_TEMPLATE_VERSION = "1"
 
 class TaggingService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, index: Optional[TaxonomyIndex] = None,
+                 llm_cache: Optional[LLMResultCache] = None):
         self.config = config
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.abs_tags = self._load_tag_files()
-        self.parsed_abs_tags = self._parse_abstractive_tags()
-        self.product_tags = self._load_extractive_tags('product_tags.json')
-        self.indication_tags = self._load_extractive_tags('indication_tags.json')
-        self.bm25 = BM25()
-        self._prepare_product_bm25_data()
-        self._prepare_indication_bm25_data()
-    
-    def _load_tag_files(self):
-        try:
-            with open('abs_tags.json', 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            raise Exception(f"Tag file error: {e}")
-    
-    def _load_extractive_tags(self, filename: str) -> Dict:
-        try:
-            with open(filename, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-    
-    def _prepare_product_bm25_data(self):
-        self.product_documents = []
-        self.product_to_tokens = {}
-        for product_name, synonyms in self.product_tags.items():
-            if isinstance(synonyms, list):
-                product_text = " ".join([product_name] + synonyms)
-                product_tokens = self.bm25.tokenize(product_text)
-                self.product_documents.append(product_tokens)
-                self.product_to_tokens[product_name] = product_tokens
-        
-        if self.product_documents:
-            self.product_idf = self.bm25.compute_idf(self.product_documents)
-            self.avg_product_doc_len = sum(len(doc) for doc in self.product_documents) / len(self.product_documents)
-        else:
-            self.product_idf = {}
-            self.avg_product_doc_len = 0
+        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key, base_url=config.openai_base_url,
+                                         max_retries=0)
+        self.chunker = TextChunker(load_token_counter(config.chunk_tokenizer_file))
+        self.rate_limiter = AdaptiveRateLimiter(config.openai_rpm_limit, config.openai_tpm_limit,
+                                                config.openai_max_concurrency)
+        self.index = index or TaxonomyIndex()
+        self._prompt_prefix = ABSTRACTIVE_PROMPT_PREFIX_TEMPLATE.format(categories_info=self.index.categories_info)
+        self.llm_cache = llm_cache or LLMResultCache(config.llm_cache_max_entries, config.llm_cache_ttl_seconds)
+        self.parsed_abs_tags = self.index.parsed_abs_tags
+        self.bm25 = self.index.bm25
     
-    def _prepare_indication_bm25_data(self):
-        self.indication_documents = []
-        self.category_to_tokens = {}
-        for category_name, category_data in self.indication_tags.items():
-            if isinstance(category_data, dict):
-                category_text_parts = [category_name]
-                for indication_name, indication_data in category_data.items():
-                    if isinstance(indication_data, dict):
-                        category_text_parts.append(indication_name)
-                        synonyms = indication_data.get('Synonyms', [])
-                        category_text_parts.extend([s for s in synonyms if isinstance(s, str)])
-                        for sub_key, sub_value in indication_data.items():
-                            if sub_key != 'Synonyms' and isinstance(sub_value, dict):
-                                category_text_parts.append(sub_key)
-                                sub_synonyms = sub_value.get('Synonyms', [])
-                                category_text_parts.extend([s for s in sub_synonyms if isinstance(s, str)])
-                
-                category_tokens = self.bm25.tokenize(" ".join(category_text_parts))
-                self.indication_documents.append(category_tokens)
-                self.category_to_tokens[category_name] = category_tokens
-        
-        if self.indication_documents:
-            self.indication_idf = self.bm25.compute_idf(self.indication_documents)
-            self.avg_indication_doc_len = sum(len(doc) for doc in self.indication_documents) / len(self.indication_documents)
-        else:
-            self.indication_idf = {}
-            self.avg_indication_doc_len = 0
+    def metrics(self) -> Dict:
+        return {
+            "taxonomy_version": self.index.version,
+            "taxonomy_build_seconds": round(self.index.build_seconds, 4),
+            "rate_limiter": self.rate_limiter.stats(),
+            "llm_cache": self.llm_cache.stats()
+        }
     
-    def _extract_tags_with_bm25(self, text: str, token_mapping: Dict, idf: Dict, avg_doc_len: float, 
-                               min_score_threshold: float = 1.0) -> Dict[str, float]:
-        if not token_mapping:
+    def _extract_tags_with_bm25(self, text_tokens: List[str], bm25_index: BM25Index,
+                               min_score_threshold: float = 1.0,
+                               phrase_hits: Optional[Dict[str, int]] = None,
+                               phrase_weight: float = PHRASE_MATCH_WEIGHT) -> Dict[str, float]:
+        if not bm25_index.postings:
             return {}
         
-        text_tokens = self.bm25.tokenize(text)
-        if not text_tokens:
+        if not text_tokens and not phrase_hits:
             return {}
         
-        scores = {}
-        for name, tokens in token_mapping.items():
-            score = self.bm25.score(text_tokens, tokens, avg_doc_len, idf)
-            if score > 0:
-                scores[name] = score
+        scores = bm25_index.score(text_tokens)
+        if phrase_hits and phrase_weight > 0:
+            # Each exact phrase hit counts as much as the strongest single-term match in this index
+            boost = phrase_weight * bm25_index.max_weight
+            for name, hits in phrase_hits.items():
+                scores[name] = scores.get(name, 0.0) + boost * hits
+            scores = {name: scores[name] for name in bm25_index.names if name in scores}
+        scores = {name: score for name, score in scores.items() if score > 0}
         
         if not scores:
             return {}
@@ -139,139 +109,89 @@ class TaggingService:
                        for name, score in filtered_scores.items()}
         return {}
     
-    def calculate_extractive_tags(self, text: str, min_score_threshold: float = 1.0) -> Dict:
-        product_matches = self._extract_tags_with_bm25(text, self.product_to_tokens, 
-                                                      self.product_idf, self.avg_product_doc_len, 
-                                                      min_score_threshold)
-        indication_matches = self._extract_tags_with_bm25(text, self.category_to_tokens, 
-                                                         self.indication_idf, self.avg_indication_doc_len, 
-                                                         min_score_threshold)
+    def calculate_extractive_tags(self, text: str, min_score_threshold: float = 1.0,
+                                  phrase_weight: float = PHRASE_MATCH_WEIGHT) -> Dict:
+        phrase_hits = {"product": {}, "indication": {}}
+        if phrase_weight > 0:
+            for (kind, name), hits in self.index.phrase_matcher.count(text).items():
+                phrase_hits[kind][name] = hits
         
-        return {"product": product_matches, "indication": indication_matches}
-    
-    def _parse_abstractive_tags(self):
-        parsed = {}
-        data_to_parse = self.abs_tags.get('Content Taxonomy', self.abs_tags)
+        text_tokens = self.bm25.tokenize(text)
+        product_matches = self._extract_tags_with_bm25(text_tokens, self.index.product_bm25_index, 
+                                                      min_score_threshold, phrase_hits["product"], phrase_weight)
+        indication_matches = self._extract_tags_with_bm25(text_tokens, self.index.indication_bm25_index, 
+                                                         min_score_threshold, phrase_hits["indication"], phrase_weight)
         
-        for main_category, category_data in data_to_parse.items():
-            if not isinstance(category_data, dict):
-                continue
-            
-            category_key = main_category.lower()
-            if category_key == 'audience':
-                category_key = 'audience'
-            elif 'purpose' in category_key:
-                category_key = 'content purpose'
-            elif 'complexity' in category_key:
-                category_key = 'content complexity'
-            elif 'non clinical' in category_key or 'nonclinical' in category_key:
-                category_key = 'non clinical topics'
-            elif 'clinical topic' in category_key or 'clinical' in category_key:
-                category_key = 'clinical topic'
-            
-            parsed[category_key] = {
-                'definition': category_data.get('definition', ''),
-                'subtags': {}
-            }
-            
-            for key, value in category_data.items():
-                if key in ['definition', 'synonyms']:
-                    continue
-                if isinstance(value, dict) and 'definition' in value:
-                    parsed[category_key]['subtags'][key] = {
-                        'definition': value.get('definition', ''),
-                        'synonyms': value.get('synonyms', []),
-                        'nested_subtags': {}
-                    }
-                    
-                    for nested_key, nested_value in value.items():
-                        if nested_key in ['definition', 'synonyms']:
-                            continue
-                        if isinstance(nested_value, dict) and 'definition' in nested_value:
-                            parsed[category_key]['subtags'][key]['nested_subtags'][nested_key] = {
-                                'definition': nested_value.get('definition', ''),
-                                'synonyms': nested_value.get('synonyms', [])
-                            }
-        return parsed
+        return {"product": product_matches, "indication": indication_matches}
     
     def prepare_categories_info(self):
-        info = ["=== ABSTRACTIVE CATEGORIES ==="]
-        for category_name, category_info in self.parsed_abs_tags.items():
-            info.append(f"\n{category_name.upper()}:")
-            info.append(f"Definition: {category_info['definition']}")
-            if category_info['subtags']:
-                info.append("Available subtags:")
-                for subtag_name, subtag_info in category_info['subtags'].items():
-                    synonyms_str = ', '.join(subtag_info['synonyms'][:3]) if subtag_info['synonyms'] else ""
-                    synonym_part = f" (Synonyms: {synonyms_str})" if synonyms_str else ""
-                    info.append(f"  - {subtag_name}: {subtag_info['definition']}{synonym_part}")
-                    
-                    if subtag_info.get('nested_subtags'):
-                        for nested_name, nested_info in subtag_info['nested_subtags'].items():
-                            nested_synonyms = ', '.join(nested_info['synonyms'][:2]) if nested_info['synonyms'] else ""
-                            nested_synonym_part = f" (Synonyms: {nested_synonyms})" if nested_synonyms else ""
-                            info.append(f"    * {nested_name}: {nested_info['definition']}{nested_synonym_part}")
-        return '\n'.join(info)
+        return self.index.categories_info
     
-    def chunk_text(self, text: str, chunk_size: int = 5000) -> List[str]:
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for word in words:
-            if current_length + len(word) > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
-            else:
-                current_chunk.append(word)
-                current_length += len(word) + 1
-        
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        return chunks
+    def _chunk_budget(self, text: str, chunk_size: int, chunk_tokens: Optional[int],
+                      chunk_overlap_tokens: int = 0) -> int:
+        """chunk_tokens when given, otherwise a budget calibrated so chunk_size never yields more chunks than before.
+        
+        The character budget is converted at the text's own token density and then grown until
+        the boundary-aligned chunks are no more than the original splitter made cutting every
+        chunk_size characters.
+        """
+        if chunk_tokens:
+            return chunk_tokens
+        if not text.strip():
+            return max(1, chunk_size // CHARS_PER_TOKEN)
+        target = character_chunk_count(text, chunk_size)
+        budget = max(1, math.ceil(chunk_size * self.chunker.count_tokens(text) / len(text)))
+        while len(self.chunker.chunk(text, budget, chunk_overlap_tokens)) > target:
+            budget = math.ceil(budget * CHUNK_BUDGET_STEP)
+        return budget
     
-    async def tag_chunk(self, chunk: str) -> Dict:
-        categories_info = self.prepare_categories_info()
-        system_prompt_template = """You are an expert content analyzer. Analyze the provided text content and identify relevant abstractive tags from the given categories. You must select ONLY the specific subtags provided in the available options, not generic terms.
-
-Available Categories and Subtags:
-{categories_info}
-
-Important Rules:
-1. ONLY use the exact subtag names provided in the categories above
-2. You can also use synonyms of the subtags if they appear in the content
-3. Multiple subtags can be selected from each category if relevant
-4. Confidence scores should be between 0.0 and 1.0
-5. Only select subtags you are highly confident about (>= 0.3)
-6. If no specific subtags are relevant, return empty objects for that category
-7. Look for exact matches, synonym matches, and conceptual matches based on definitions
-8. Pay attention to the context and meaning of the content when selecting tags
-9. For parent tags with nested subtags (like Treatment), identify both the parent and relevant nested subtags
-10. Score nested subtags separately from their parent tags
-
-Output Format:
-Return ONLY a valid JSON object with this exact structure:
-{{
-    "abstractive": {{
-        "audience": {{"exact_subtag_name_or_synonym": confidence_score}},
-        "content purpose": {{"exact_subtag_name_or_synonym": confidence_score}},
-        "content complexity": {{"exact_subtag_name_or_synonym": confidence_score}},
-        "non clinical topics": {{"exact_subtag_name_or_synonym": confidence_score}},
-        "clinical topic": {{"exact_subtag_name_or_synonym": confidence_score}}
-    }}
-}}
-
-Text Content to Analyze:
-{content}"""
-        
-        prompt = system_prompt_template.format(categories_info=categories_info, content=chunk)
+    def chunk_text(self, text: str, chunk_size: int = 5000, chunk_tokens: Optional[int] = None,
+                   chunk_overlap_tokens: int = 0) -> List[str]:
+        """Split on paragraph, table and sentence boundaries; the budget is chunk_tokens, or chunk_size characters converted to tokens"""
+        return self.chunker.chunk(text, self._chunk_budget(text, chunk_size, chunk_tokens, chunk_overlap_tokens),
+                                  chunk_overlap_tokens)
+    
+    async def _create_completion(self, **kwargs):
+        """Run a chat completion under the shared rate limiter, backing off and retrying on 429/5xx responses"""
+        estimated_tokens = sum(estimate_tokens(m["content"]) for m in kwargs["messages"]) + kwargs.get("max_tokens", 0)
+        for attempt in range(MAX_LLM_RETRIES + 1):
+            async with self.rate_limiter.slot(estimated_tokens) as outcome:
+                try:
+                    response = await self.openai_client.chat.completions.create(**kwargs)
+                except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                    if attempt == MAX_LLM_RETRIES:
+                        raise
+                    self.rate_limiter.backoff(retry_after_seconds(e))
+                    continue
+                outcome["used_tokens"] = response.usage.total_tokens if response.usage else None
+                outcome["success"] = True
+                return response
+    
+    def build_prompt(self, chunk: str, top_k: Optional[int] = None):
+        """Return (prompt, prompt version) for a chunk.
+        
+        With top_k > 0 only the top_k BM25 candidates per category are described and the other
+        subtags are listed by name; the shared prefix is then per chunk and not prompt-cacheable.
+        """
+        if top_k is None:
+            top_k = self.config.taxonomy_prefilter_top_k
+        if not top_k:
+            return self._prompt_prefix + chunk, PROMPT_TEMPLATE_VERSION
+        categories_info = self.index.render_categories_info(self.index.select_subtags(chunk, top_k))
+        prompt = ABSTRACTIVE_PROMPT_PREFIX_TEMPLATE.format(categories_info=categories_info) + chunk
+        return prompt, f"{PROMPT_TEMPLATE_VERSION}-top{top_k}"
+    
+    async def tag_chunk(self, chunk: str, top_k: Optional[int] = None, use_cache: bool = True) -> Dict:
+        prompt, prompt_version = self.build_prompt(chunk, top_k)
         
         models_to_try = ["gpt-4o"]
         for model in models_to_try:
+            cache_key = llm_cache_key(chunk, model, prompt_version, self.index.version)
+            cached_result = await self.llm_cache.get(cache_key) if use_cache else None
+            if cached_result is not None:
+                return cached_result
             try:
-                response = await self.openai_client.chat.completions.create(
+                response = await self._create_completion(
                     model=model,
                     messages=[
                         {"role": "system", "content": "You are an expert content analyzer. Return only valid JSON responses with exact subtag names from the provided options."},
@@ -285,6 +205,8 @@ Text Content to Analyze:
                 try:
                     result = json.loads(content)
                     validated_result = self._validate_and_clean_result(result)
+                    if use_cache:
+                        await self.llm_cache.set(cache_key, validated_result)
                     return validated_result
                 except json.JSONDecodeError:
                     continue
@@ -315,54 +237,18 @@ Text Content to Analyze:
         if not isinstance(result, dict):
             return cleaned
         
-        if "abstractive" in result and isinstance(result["abstractive"], dict):
-            category_mapping = {
-                "audience": "audience",
-                "content purpose": "content purpose", 
-                "content complexity": "content complexity",
-                "non clinical topics": "non clinical topics",
-                "clinical topic": "clinical topic"
-            }
-            
-            for result_key, clean_key in category_mapping.items():
-                if result_key in result["abstractive"] and isinstance(result["abstractive"][result_key], dict):
-                    valid_subtags = {}
-                    valid_nested_subtags = {}
-                    synonym_to_main_tag = {}
-                    synonym_to_nested_tag = {}
-                    
-                    if clean_key in self.parsed_abs_tags:
-                        category_info = self.parsed_abs_tags[clean_key]
-                        for subtag_name, subtag_info in category_info['subtags'].items():
-                            valid_subtags[subtag_name] = subtag_info
-                            for synonym in subtag_info.get('synonyms', []):
-                                synonym_to_main_tag[synonym.lower()] = subtag_name
-                            
-                            for nested_name, nested_info in subtag_info.get('nested_subtags', {}).items():
-                                valid_nested_subtags[nested_name] = nested_info
-                                for synonym in nested_info.get('synonyms', []):
-                                    synonym_to_nested_tag[synonym.lower()] = nested_name
-                    
-                    for tag, score in result["abstractive"][result_key].items():
-                        if isinstance(score, (int, float)) and 0 <= score <= 1:
-                            main_tag_name = None
-                            
-                            if tag in valid_subtags:
-                                main_tag_name = tag
-                            elif tag.lower() in synonym_to_main_tag:
-                                main_tag_name = synonym_to_main_tag[tag.lower()]
-                            elif tag in valid_nested_subtags:
-                                main_tag_name = tag
-                            elif tag.lower() in synonym_to_nested_tag:
-                                main_tag_name = synonym_to_nested_tag[tag.lower()]
-                            else:
-                                for valid_tag in list(valid_subtags.keys()) + list(valid_nested_subtags.keys()):
-                                    if tag.lower() == valid_tag.lower():
-                                        main_tag_name = valid_tag
-                                        break
-                            
-                            if main_tag_name:
-                                cleaned["abstractive"][clean_key][main_tag_name] = float(score)
+        abstractive = result.get("abstractive")
+        if isinstance(abstractive, dict):
+            resolver = self.index.tag_resolver
+            for category, cleaned_tags in cleaned["abstractive"].items():
+                tags = abstractive.get(category)
+                if not isinstance(tags, dict):
+                    continue
+                for tag, score in tags.items():
+                    if isinstance(score, (int, float)) and 0 <= score <= 1:
+                        main_tag_name = resolver.resolve(category, tag)
+                        if main_tag_name:
+                            cleaned_tags[main_tag_name] = float(score)
         
         return cleaned
     
@@ -454,137 +340,257 @@ Text Content to Analyze:
         
         return renormalized_tags
     
-    def _calculate_clinical_nonclinical_distribution(self, chunk_results: List[Dict]) -> Dict[str, float]:
-        clinical_raw_scores = []
-        non_clinical_raw_scores = []
-        
+    def _aggregate(self, chunk_results: List[Dict]) -> ChunkResultAggregator:
+        aggregator = ChunkResultAggregator()
         for result in chunk_results:
-            if not isinstance(result, dict) or "abstractive" not in result:
-                continue
-                
-            clinical_topics = result["abstractive"].get("clinical topic", {})
-            for tag, score in clinical_topics.items():
-                if isinstance(score, (int, float)) and score >= 0.3:
-                    clinical_raw_scores.append(score)
-            
-            non_clinical_topics = result["abstractive"].get("non clinical topics", {})
-            for tag, score in non_clinical_topics.items():
-                if isinstance(score, (int, float)) and score >= 0.3:
-                    non_clinical_raw_scores.append(score)
-        
-        clinical_avg_confidence = sum(clinical_raw_scores) / len(clinical_raw_scores) if clinical_raw_scores else 0.0
-        non_clinical_avg_confidence = sum(non_clinical_raw_scores) / len(non_clinical_raw_scores) if non_clinical_raw_scores else 0.0
-        
-        total_chunks = len(chunk_results)
-        clinical_frequency = len(set(i for i, result in enumerate(chunk_results) 
-                                   if result.get("abstractive", {}).get("clinical topic", {}))) / total_chunks if total_chunks > 0 else 0
-        non_clinical_frequency = len(set(i for i, result in enumerate(chunk_results) 
-                                       if result.get("abstractive", {}).get("non clinical topics", {}))) / total_chunks if total_chunks > 0 else 0
-        
-        clinical_weighted = clinical_avg_confidence * clinical_frequency
-        non_clinical_weighted = non_clinical_avg_confidence * non_clinical_frequency
-        
-        total_weighted = clinical_weighted + non_clinical_weighted
-        
-        if total_weighted == 0:
-            return {
-                "clinical": 0.0,
-                "non_clinical": 0.0
-            }
-        
-        clinical_percentage = round((clinical_weighted / total_weighted) * 100, 1)
-        non_clinical_percentage = round((non_clinical_weighted / total_weighted) * 100, 1)
-        
-        if clinical_percentage + non_clinical_percentage != 100.0:
-            diff = 100.0 - (clinical_percentage + non_clinical_percentage)
-            if abs(diff) <= 0.1:
-                if clinical_percentage >= non_clinical_percentage:
-                    clinical_percentage += diff
-                else:
-                    non_clinical_percentage += diff
-            clinical_percentage = max(0.0, round(clinical_percentage, 1))
-            non_clinical_percentage = max(0.0, round(non_clinical_percentage, 1))
-        
-        return {
-            "clinical": clinical_percentage,
-            "non_clinical": non_clinical_percentage
-        }
+            aggregator.add(result)
+        return aggregator
+    
+    def _calculate_clinical_nonclinical_distribution(self, chunk_results: List[Dict]) -> Dict[str, float]:
+        return self._aggregate(chunk_results).content_distribution()
     
     def combine_chunk_results(self, chunk_results: List[Dict]) -> Dict:
+        return self._combine_aggregate(self._aggregate(chunk_results))
+    
+    def _combine_aggregate(self, aggregator: ChunkResultAggregator) -> Dict:
         combined = self._get_empty_result()
-        abstractive_occurrences = {
-            "audience": {},
-            "content purpose": {},
-            "content complexity": {},
-            "non clinical topics": {},
-            "clinical topic": {}
-        }
-        
-        for result in chunk_results:
-            if not isinstance(result, dict) or "abstractive" not in result:
-                continue
-            for category in abstractive_occurrences.keys():
-                if category in result["abstractive"]:
-                    for tag, score in result["abstractive"][category].items():
-                        if score >= 0.3:
-                            if tag not in abstractive_occurrences[category]:
-                                abstractive_occurrences[category][tag] = []
-                            abstractive_occurrences[category][tag].append(score)
-        
-        for category in abstractive_occurrences.keys():
-            if abstractive_occurrences[category]:
-                category_tags = {}
-                total_chunks = len(chunk_results)
-                
-                for tag, scores in abstractive_occurrences[category].items():
-                    avg_score = sum(scores) / len(scores)
-                    frequency_weight = len(scores) / total_chunks
-                    raw_weighted_score = avg_score * frequency_weight
-                    category_tags[tag] = raw_weighted_score
-                
-                if category_tags:
-                    total_raw_score = sum(category_tags.values())
-                    if total_raw_score > 0:
-                        for tag in category_tags:
-                            normalized_score = (category_tags[tag] / total_raw_score) * 100
-                            category_tags[tag] = round(normalized_score, 1)
-                
+        for category in ABSTRACTIVE_CATEGORIES:
+            if aggregator.tag_stats[category]:
+                category_tags = aggregator.category_scores(category)
                 if category == "clinical topic":
                     hierarchical_tags = self._create_hierarchical_clinical_topic_structure(category_tags)
                     hierarchical_tags = self._renormalize_hierarchical_clinical_tags(hierarchical_tags)
                     combined["abstractive"][category] = hierarchical_tags
                 else:
                     combined["abstractive"][category] = category_tags
-        
         return combined
     
-    async def tag_document(self, text: str, chunk_size: int = 5000, min_extractive_threshold: float = 1.0) -> Dict:
-        if not text.strip():
-            return {
-                "extractive": {"indication": {}, "product": {}},
-                "abstractive": {"audience": {}, "content purpose": {}, "content complexity": {}, 
-                               "non clinical topics": {}, "clinical topic": {}},
-                "content_distribution": {"clinical": 0.0, "non_clinical": 0.0}
-            }
-        
-        chunks = self.chunk_text(text, chunk_size)
-        chunk_results = []
-        batch_size = 2
-        
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i+batch_size]
-            batch_tasks = [self.tag_chunk(chunk) for chunk in batch]
-            batch_results = await asyncio.gather(*batch_tasks)
-            chunk_results.extend(batch_results)
-            if i + batch_size < len(chunks):
-                await asyncio.sleep(2)
+    async def _tag_indexed_chunk(self, index: int, chunk: str):
+        return index, await self.tag_chunk(chunk)
+    
+    async def _iter_chunk_results(self, chunks: List[str]):
+        """Yield (chunk index, result) pairs in completion order so one slow chunk does not hold back the rest"""
+        tasks = [asyncio.ensure_future(self._tag_indexed_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _timed_tag_chunk(self, chunk: str, top_k: int):
+        # Always a live LLM call: a cached result would make the latency comparison meaningless
+        start = time.perf_counter()
+        result = await self.tag_chunk(chunk, top_k, use_cache=False)
+        return result, time.perf_counter() - start
+    
+    async def prefilter_report(self, text: str, top_k: int, chunk_size: int = 5000,
+                               chunk_tokens: Optional[int] = None) -> Dict:
+        """Tag every chunk with the full and the BM25-prefiltered taxonomy and compare the two.
+        
+        Recall is measured against the full-prompt tags: candidate_recall counts those the
+        prefilter described in detail, tag_recall those the prefiltered prompt actually returned.
+        Both arms bypass the LLM result cache so their latencies are comparable.
+        """
+        chunks = self.chunk_text(text, chunk_size, chunk_tokens)
+        prompt_tokens = {"full": 0, "prefiltered": 0}
+        latency = {"full": 0.0, "prefiltered": 0.0}
+        full_total = candidate_hits = tag_hits = 0
+        missed = {category: {} for category in ABSTRACTIVE_CATEGORIES}
+        
+        for chunk in chunks:
+            prompt_tokens["full"] += self.chunker.count_tokens(self.build_prompt(chunk, 0)[0])
+            prompt_tokens["prefiltered"] += self.chunker.count_tokens(self.build_prompt(chunk, top_k)[0])
+        
+        comparisons = await asyncio.gather(*[
+            asyncio.gather(self._timed_tag_chunk(chunk, 0), self._timed_tag_chunk(chunk, top_k))
+            for chunk in chunks
+        ])
+        for chunk, ((full_result, full_seconds), (filtered_result, filtered_seconds)) in zip(chunks, comparisons):
+            latency["full"] += full_seconds
+            latency["prefiltered"] += filtered_seconds
+            selected = self.index.select_subtags(chunk, top_k)
+            for category in ABSTRACTIVE_CATEGORIES:
+                candidates = set()
+                for subtag_name in selected.get(category, []):
+                    candidates.add(subtag_name)
+                    candidates.update(self.parsed_abs_tags[category]['subtags'][subtag_name].get('nested_subtags', {}))
+                filtered_tags = filtered_result["abstractive"][category]
+                for tag in full_result["abstractive"][category]:
+                    full_total += 1
+                    candidate_hits += tag in candidates
+                    if tag in filtered_tags:
+                        tag_hits += 1
+                    else:
+                        missed[category][tag] = missed[category].get(tag, 0) + 1
         
-        content_distribution = self._calculate_clinical_nonclinical_distribution(chunk_results)
-        abstractive_result = self.combine_chunk_results(chunk_results)
+        return {
+            "top_k": top_k,
+            "chunks": len(chunks),
+            "prompt_tokens": {
+                **prompt_tokens,
+                "reduction": round(prompt_tokens["full"] / prompt_tokens["prefiltered"], 2) if prompt_tokens["prefiltered"] else 0.0
+            },
+            "latency_seconds": {mode: round(seconds, 3) for mode, seconds in latency.items()},
+            "full_tags": full_total,
+            "candidate_recall": round(candidate_hits / full_total, 3) if full_total else 1.0,
+            "tag_recall": round(tag_hits / full_total, 3) if full_total else 1.0,
+            "missed_tags": {category: tags for category, tags in missed.items() if tags}
+        }
+    
+    def _get_empty_document_tags(self) -> Dict:
+        return {
+            "extractive": {"indication": {}, "product": {}},
+            "abstractive": {"audience": {}, "content purpose": {}, "content complexity": {}, 
+                           "non clinical topics": {}, "clinical topic": {}},
+            "content_distribution": {"clinical": 0.0, "non_clinical": 0.0}
+        }
+    
+    def _document_extractive_tags(self, text: str, min_extractive_threshold: float) -> Dict:
         extractive_result = self.calculate_extractive_tags(text, min_extractive_threshold)
-        
+        return {"indication": extractive_result["indication"], "product": extractive_result["product"]}
+    
+    def _document_tags(self, extractive: Dict, aggregator: ChunkResultAggregator) -> Dict:
         return {
-            "extractive": {"indication": extractive_result["indication"], "product": extractive_result["product"]},
-            "abstractive": abstractive_result["abstractive"],
-            "content_distribution": content_distribution
-        }
\ No newline at end of file
+            "extractive": extractive,
+            "abstractive": self._combine_aggregate(aggregator)["abstractive"],
+            "content_distribution": aggregator.content_distribution()
+        }
+    
+    async def stream_tag_document(self, text: str, chunk_size: int = 5000, min_extractive_threshold: float = 1.0,
+                                  chunk_tokens: Optional[int] = None, chunk_overlap_tokens: int = 0,
+                                  include_progress: bool = True):
+        """Yield ("extractive" | "progress" | "tags", payload) events while a document is being tagged.
+        
+        Extractive tags need no LLM call and are emitted first; a progress event with the partial
+        abstractive aggregate follows every completed chunk and the final "tags" payload is the
+        same dict tag_document returns.
+        """
+        if not text.strip():
+            yield "tags", self._get_empty_document_tags()
+            return
+        
+        extractive = self._document_extractive_tags(text, min_extractive_threshold)
+        yield "extractive", extractive
+        
+        chunks = self.chunk_text(text, chunk_size, chunk_tokens, chunk_overlap_tokens)
+        aggregator = ChunkResultAggregator()
+        async for chunk_index, result in self._iter_chunk_results(chunks):
+            aggregator.add(result, chunk_index)
+            if include_progress:
+                yield "progress", {
+                    "completed_chunks": aggregator.total_chunks,
+                    "total_chunks": len(chunks),
+                    "abstractive": self._combine_aggregate(aggregator)["abstractive"],
+                    "content_distribution": aggregator.content_distribution()
+                }
+        
+        yield "tags", self._document_tags(extractive, aggregator)
+    
+    async def tag_document(self, text: str, chunk_size: int = 5000, min_extractive_threshold: float = 1.0,
+                           chunk_tokens: Optional[int] = None, chunk_overlap_tokens: int = 0) -> Dict:
+        tags = None
+        async for event, payload in self.stream_tag_document(text, chunk_size, min_extractive_threshold,
+                                                             chunk_tokens, chunk_overlap_tokens,
+                                                             include_progress=False):
+            if event == "tags":
+                tags = payload
+        return tags
+    
+    async def tag_document_incremental(self, text: str, tag_chunks: Optional[Dict] = None, chunk_size: int = 5000,
+                                       min_extractive_threshold: float = 1.0, chunk_tokens: Optional[int] = None,
+                                       chunk_overlap_tokens: int = 0) -> Tuple[Dict, Optional[Dict]]:
+        """Tag a document, reusing per-chunk results stored from a previous run for unchanged chunks.
+        
+        tag_chunks is the record returned by an earlier call. Stored results are only reused when
+        the taxonomy, prompt and chunking settings are unchanged; new boundaries are aligned with
+        the stored ones so an edit only re-tags the chunks it touches. Returns (tags, tag_chunks),
+        where the new record also counts the reused and freshly tagged chunks.
+        """
+        if not text.strip():
+            return self._get_empty_document_tags(), None
+        
+        max_tokens = self._chunk_budget(text, chunk_size, chunk_tokens, chunk_overlap_tokens)
+        # Keyed on the requested settings: a character budget converts differently as the text changes
+        budget = f"{chunk_tokens}t" if chunk_tokens else f"{chunk_size}c"
+        version = f"{self.index.version}:{self.build_prompt('', None)[1]}:{budget}:{chunk_overlap_tokens}"
+        previous = tag_chunks["chunks"] if tag_chunks and tag_chunks.get("version") == version else []
+        stored_results = {record["hash"]: record["result"] for record in previous}
+        layout = self.chunker.chunk_layout(text, max_tokens, chunk_overlap_tokens,
+                                           [(record["head"], record["units"], record["hash"]) for record in previous])
+        
+        records = [{"hash": text_hash(chunk), "head": head, "units": units, "result": None}
+                   for chunk, head, units in layout]
+        aggregator = ChunkResultAggregator()
+        pending = []
+        for chunk_index, record in enumerate(records):
+            if record["hash"] in stored_results:
+                record["result"] = stored_results[record["hash"]]
+                aggregator.add(record["result"], chunk_index)
+            else:
+                pending.append(chunk_index)
+        
+        async for pending_index, result in self._iter_chunk_results([layout[i][0] for i in pending]):
+            records[pending[pending_index]]["result"] = result
+            aggregator.add(result, pending[pending_index])
+        
+        extractive = self._document_extractive_tags(text, min_extractive_threshold)
+        new_tag_chunks = {
+            "version": version,
+            "chunks": records,
+            "reused": len(records) - len(pending),
+            "tagged": len(pending)
+        }
+        return self._document_tags(extractive, aggregator), new_tag_chunks
+    
+    async def tag_documents(self, texts: Dict[str, str], chunk_size: int = 5000,
+                            min_extractive_threshold: float = 1.0, chunk_tokens: Optional[int] = None,
+                            chunk_overlap_tokens: int = 0) -> Dict[str, Dict]:
+        """Tag many documents through one global chunk queue drained by a shared pool of workers.
+        
+        Returns {document_id: {"tags", "chunks", "processing_time", "error"}}, where processing_time
+        is measured from the start of the batch until the document's last chunk completed.
+        """
+        start = time.perf_counter()
+        outcomes = {}
+        aggregators = {}
+        remaining = {}
+        queue = asyncio.Queue()
+        
+        def finish(document_id: str, tags: Optional[Dict], error: Optional[str] = None):
+            outcomes[document_id] = {
+                "tags": tags,
+                "chunks": aggregators[document_id].total_chunks if document_id in aggregators else 0,
+                "processing_time": time.perf_counter() - start,
+                "error": error
+            }
+        
+        for document_id, text in texts.items():
+            if not text.strip():
+                finish(document_id, self._get_empty_document_tags())
+                continue
+            chunks = self.chunk_text(text, chunk_size, chunk_tokens, chunk_overlap_tokens)
+            aggregators[document_id] = ChunkResultAggregator()
+            remaining[document_id] = len(chunks)
+            for chunk_index, chunk in enumerate(chunks):
+                queue.put_nowait((document_id, chunk_index, chunk))
+        
+        async def worker():
+            while not queue.empty():
+                document_id, chunk_index, chunk = queue.get_nowait()
+                if document_id in outcomes:
+                    continue
+                try:
+                    result = await self.tag_chunk(chunk)
+                except Exception as e:
+                    finish(document_id, None, str(e))
+                    continue
+                aggregators[document_id].add(result, chunk_index)
+                remaining[document_id] -= 1
+                if remaining[document_id] == 0:
+                    extractive = self._document_extractive_tags(texts[document_id], min_extractive_threshold)
+                    finish(document_id, self._document_tags(extractive, aggregators[document_id]))
+        
+        worker_count = min(self.rate_limiter.max_concurrency, queue.qsize())
+        await asyncio.gather(*[worker() for _ in range(worker_count)])
+        return outcomes
@@ -0,0 +1,253 @@
+from typing import Dict, List, Optional
+import json
+import time
+import hashlib
+from services.bm25 import BM25, BM25Index
+from services.phrase_matcher import PhraseMatcher
+from services.tag_resolver import TagResolver
+
+ABSTRACTIVE_TAGS_FILE = 'abs_tags.json'
+PRODUCT_TAGS_FILE = 'product_tags.json'
+INDICATION_TAGS_FILE = 'indication_tags.json'
+
+class TaxonomyIndex:
+    """Parsed taxonomy and BM25 data, built once per process and shared read-only by all requests."""
+
+    def __init__(self, abs_tags_file: str = ABSTRACTIVE_TAGS_FILE,
+                 product_tags_file: str = PRODUCT_TAGS_FILE,
+                 indication_tags_file: str = INDICATION_TAGS_FILE):
+        start = time.perf_counter()
+        self._digest = hashlib.sha256()
+        self.abs_tags = self._load_tag_files(abs_tags_file)
+        self.parsed_abs_tags = self._parse_abstractive_tags()
+        self.categories_info = self.render_categories_info()
+        self.tag_resolver = TagResolver(self.parsed_abs_tags)
+        self.product_tags = self._load_extractive_tags(product_tags_file)
+        self.indication_tags = self._load_extractive_tags(indication_tags_file)
+        self.bm25 = BM25()
+        self._prepare_subtag_bm25_data()
+        self._prepare_product_bm25_data()
+        self._prepare_indication_bm25_data()
+        self.phrase_matcher = PhraseMatcher(self._iter_extractive_phrases())
+        self.version = self._digest.hexdigest()[:12]
+        del self._digest
+        self.build_seconds = time.perf_counter() - start
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"TaxonomyIndex is read-only, cannot set '{name}'")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"TaxonomyIndex is read-only, cannot delete '{name}'")
+        super().__delattr__(name)
+
+    def _read_json(self, filename: str) -> Dict:
+        with open(filename, 'rb') as f:
+            raw = f.read()
+        self._digest.update(raw)
+        return json.loads(raw)
+
+    def _load_tag_files(self, filename: str):
+        try:
+            return self._read_json(filename)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            raise Exception(f"Tag file error: {e}")
+
+    def _load_extractive_tags(self, filename: str) -> Dict:
+        try:
+            return self._read_json(filename)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _prepare_product_bm25_data(self):
+        self.product_documents = []
+        self.product_to_tokens = {}
+        for product_name, synonyms in self.product_tags.items():
+            if isinstance(synonyms, list):
+                product_text = " ".join([product_name] + synonyms)
+                product_tokens = self.bm25.tokenize(product_text)
+                self.product_documents.append(product_tokens)
+                self.product_to_tokens[product_name] = product_tokens
+
+        if self.product_documents:
+            self.product_idf = self.bm25.compute_idf(self.product_documents)
+            self.avg_product_doc_len = sum(len(doc) for doc in self.product_documents) / len(self.product_documents)
+        else:
+            self.product_idf = {}
+            self.avg_product_doc_len = 0
+        self.product_bm25_index = BM25Index(self.bm25, self.product_to_tokens,
+                                            self.product_idf, self.avg_product_doc_len)
+
+    def _prepare_indication_bm25_data(self):
+        self.indication_documents = []
+        self.category_to_tokens = {}
+        for category_name, category_data in self.indication_tags.items():
+            if isinstance(category_data, dict):
+                category_text_parts = [category_name]
+                for indication_name, indication_data in category_data.items():
+                    if isinstance(indication_data, dict):
+                        category_text_parts.append(indication_name)
+                        synonyms = indication_data.get('Synonyms', [])
+                        category_text_parts.extend([s for s in synonyms if isinstance(s, str)])
+                        for sub_key, sub_value in indication_data.items():
+                            if sub_key != 'Synonyms' and isinstance(sub_value, dict):
+                                category_text_parts.append(sub_key)
+                                sub_synonyms = sub_value.get('Synonyms', [])
+                                category_text_parts.extend([s for s in sub_synonyms if isinstance(s, str)])
+
+                category_tokens = self.bm25.tokenize(" ".join(category_text_parts))
+                self.indication_documents.append(category_tokens)
+                self.category_to_tokens[category_name] = category_tokens
+
+        if self.indication_documents:
+            self.indication_idf = self.bm25.compute_idf(self.indication_documents)
+            self.avg_indication_doc_len = sum(len(doc) for doc in self.indication_documents) / len(self.indication_documents)
+        else:
+            self.indication_idf = {}
+            self.avg_indication_doc_len = 0
+        self.indication_bm25_index = BM25Index(self.bm25, self.category_to_tokens,
+                                               self.indication_idf, self.avg_indication_doc_len)
+
+    def _iter_extractive_phrases(self):
+        for product_name, synonyms in self.product_tags.items():
+            if isinstance(synonyms, list):
+                for phrase in [product_name] + synonyms:
+                    yield phrase, ('product', product_name)
+
+        for category_name, category_data in self.indication_tags.items():
+            if not isinstance(category_data, dict):
+                continue
+            label = ('indication', category_name)
+            yield category_name, label
+            for indication_name, indication_data in category_data.items():
+                if indication_name == 'Synonyms' and isinstance(indication_data, list):
+                    for synonym in indication_data:
+                        yield synonym, label
+                if not isinstance(indication_data, dict):
+                    continue
+                yield indication_name, label
+                for synonym in indication_data.get('Synonyms', []):
+                    yield synonym, label
+                for sub_key, sub_value in indication_data.items():
+                    if sub_key != 'Synonyms' and isinstance(sub_value, dict):
+                        yield sub_key, label
+                        for synonym in sub_value.get('Synonyms', []):
+                            yield synonym, label
+
+    def _parse_abstractive_tags(self):
+        parsed = {}
+        data_to_parse = self.abs_tags.get('Content Taxonomy', self.abs_tags)
+
+        for main_category, category_data in data_to_parse.items():
+            if not isinstance(category_data, dict):
+                continue
+
+            category_key = main_category.lower()
+            if category_key == 'audience':
+                category_key = 'audience'
+            elif 'purpose' in category_key:
+                category_key = 'content purpose'
+            elif 'complexity' in category_key:
+                category_key = 'content complexity'
+            elif 'non clinical' in category_key or 'nonclinical' in category_key:
+                category_key = 'non clinical topics'
+            elif 'clinical topic' in category_key or 'clinical' in category_key:
+                category_key = 'clinical topic'
+
+            parsed[category_key] = {
+                'definition': category_data.get('definition', ''),
+                'subtags': {}
+            }
+
+            for key, value in category_data.items():
+                if key in ['definition', 'synonyms']:
+                    continue
+                if isinstance(value, dict) and 'definition' in value:
+                    parsed[category_key]['subtags'][key] = {
+                        'definition': value.get('definition', ''),
+                        'synonyms': value.get('synonyms', []),
+                        'nested_subtags': {}
+                    }
+
+                    for nested_key, nested_value in value.items():
+                        if nested_key in ['definition', 'synonyms']:
+                            continue
+                        if isinstance(nested_value, dict) and 'definition' in nested_value:
+                            parsed[category_key]['subtags'][key]['nested_subtags'][nested_key] = {
+                                'definition': nested_value.get('definition', ''),
+                                'synonyms': nested_value.get('synonyms', [])
+                            }
+        return parsed
+
+    def _prepare_subtag_bm25_data(self):
+        """One BM25 document per abstractive subtag (name, definition, synonyms and nested subtags), indexed per category"""
+        self.subtag_bm25_indexes = {}
+        for category_name, category_info in self.parsed_abs_tags.items():
+            subtag_to_tokens = {}
+            for subtag_name, subtag_info in category_info['subtags'].items():
+                subtag_text_parts = [subtag_name, subtag_info['definition']] + subtag_info['synonyms']
+                for nested_name, nested_info in subtag_info.get('nested_subtags', {}).items():
+                    subtag_text_parts.extend([nested_name, nested_info['definition']] + nested_info['synonyms'])
+                subtag_to_tokens[subtag_name] = self.bm25.tokenize(" ".join(subtag_text_parts))
+
+            documents = list(subtag_to_tokens.values())
+            if documents:
+                idf = self.bm25.compute_idf(documents)
+                avg_doc_len = sum(len(doc) for doc in documents) / len(documents) or 1
+            else:
+                idf = {}
+                avg_doc_len = 1
+            self.subtag_bm25_indexes[category_name] = BM25Index(self.bm25, subtag_to_tokens, idf, avg_doc_len)
+
+    def select_subtags(self, text: str, top_k: int) -> Dict[str, List[str]]:
+        """Top-K subtags per category by BM25 score against the text, in taxonomy order.
+
+        Categories with at most top_k subtags are kept whole; elsewhere only subtags with a
+        positive score are candidates.
+        """
+        text_tokens = self.bm25.tokenize(text)
+        selected = {}
+        for category_name, category_info in self.parsed_abs_tags.items():
+            subtag_names = list(category_info['subtags'])
+            if len(subtag_names) <= top_k:
+                selected[category_name] = subtag_names
+                continue
+            scores = self.subtag_bm25_indexes[category_name].score(text_tokens)
+            ranked = sorted((name for name, score in scores.items() if score > 0),
+                            key=lambda name: -scores[name])[:top_k]
+            selected[category_name] = [name for name in subtag_names if name in ranked]
+        return selected
+
+    def render_categories_info(self, selected: Optional[Dict[str, List[str]]] = None) -> str:
+        """Render the abstractive taxonomy for the prompt, optionally limited to selected subtags.
+
+        Subtags left out of the selection are still listed by name so the model can fall back to them.
+        """
+        info = ["=== ABSTRACTIVE CATEGORIES ==="]
+        for category_name, category_info in self.parsed_abs_tags.items():
+            info.append(f"\n{category_name.upper()}:")
+            info.append(f"Definition: {category_info['definition']}")
+            if category_info['subtags']:
+                candidates = selected.get(category_name, []) if selected is not None else category_info['subtags']
+                other_names = []
+                info.append("Available subtags:")
+                for subtag_name, subtag_info in category_info['subtags'].items():
+                    if subtag_name not in candidates:
+                        other_names.append(subtag_name)
+                        other_names.extend(subtag_info.get('nested_subtags', {}))
+                        continue
+                    synonyms_str = ', '.join(subtag_info['synonyms'][:3]) if subtag_info['synonyms'] else ""
+                    synonym_part = f" (Synonyms: {synonyms_str})" if synonyms_str else ""
+                    info.append(f"  - {subtag_name}: {subtag_info['definition']}{synonym_part}")
+
+                    if subtag_info.get('nested_subtags'):
+                        for nested_name, nested_info in subtag_info['nested_subtags'].items():
+                            nested_synonyms = ', '.join(nested_info['synonyms'][:2]) if nested_info['synonyms'] else ""
+                            nested_synonym_part = f" (Synonyms: {nested_synonyms})" if nested_synonyms else ""
+                            info.append(f"    * {nested_name}: {nested_info['definition']}{nested_synonym_part}")
+                if other_names:
+                    info.append(f"Other subtags (only if clearly relevant): {', '.join(other_names)}")
+        return '\n'.join(info)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app is run from tagging_api/: imports are top-level and the taxonomy JSON files are read from the cwd
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,61 @@
+import random
+import pytest
+from services.taxonomy_index import TaxonomyIndex
+
+@pytest.fixture(scope="module")
+def index():
+    return TaxonomyIndex()
+
+def _queries(index, token_mapping):
+    """Tag documents themselves, mixes of several of them and a piece of clinical prose"""
+    rng = random.Random(0)
+    documents = [tokens for tokens in token_mapping.values() if tokens]
+    queries = documents[:50]
+    for _ in range(50):
+        queries.append([token for tokens in rng.sample(documents, min(4, len(documents))) for token in tokens])
+    queries.append(index.bm25.tokenize("Adults with type 2 diabetes and chronic kidney disease received the "
+                                       "treatment once daily; insulin doses were adjusted for hypoglycaemia."))
+    return queries
+
+def _token_mappings(index):
+    yield "product", index.product_to_tokens, index.product_idf, index.avg_product_doc_len, index.product_bm25_index
+    yield "indication", index.category_to_tokens, index.indication_idf, index.avg_indication_doc_len, index.indication_bm25_index
+
+def test_index_scores_match_bm25(index):
+    for kind, token_mapping, idf, avg_doc_len, bm25_index in _token_mappings(index):
+        assert token_mapping, f"no {kind} tags loaded"
+        for query in _queries(index, token_mapping):
+            scores = bm25_index.score(query)
+            for name, tokens in token_mapping.items():
+                expected = index.bm25.score(query, tokens, avg_doc_len, idf)
+                assert scores.get(name, 0.0) == expected, (kind, name)
+
+def _baseline_extractive(index, text_tokens, token_mapping, idf, avg_doc_len, min_score_threshold):
+    """calculate_extractive_tags before the inverted index: score every tag document with BM25.score"""
+    scores = {}
+    for name, tokens in token_mapping.items():
+        score = index.bm25.score(text_tokens, tokens, avg_doc_len, idf)
+        if score > 0:
+            scores[name] = score
+    if not scores:
+        return {}
+    total_score = sum(scores.values())
+    filtered_scores = {name: round(score / total_score * 100, 1) for name, score in scores.items()
+                       if score / total_score * 100 >= min_score_threshold}
+    remaining_total = sum(filtered_scores.values())
+    if not filtered_scores or remaining_total <= 0:
+        return {}
+    return {name: round(score / remaining_total * 100, 1) for name, score in filtered_scores.items()}
+
+def test_extractive_tags_match_baseline(index, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from configs.config import get_config
+    from services.tagging_service import TaggingService
+    service = TaggingService(get_config(), index=index)
+
+    for kind, token_mapping, idf, avg_doc_len, _ in _token_mappings(index):
+        for query in _queries(index, token_mapping):
+            text = " ".join(query)
+            result = service.calculate_extractive_tags(text, 1.0, phrase_weight=0)
+            expected = _baseline_extractive(index, index.bm25.tokenize(text), token_mapping, idf, avg_doc_len, 1.0)
+            assert result[kind] == expected
@@ -0,0 +1,83 @@
+import json
+import random
+import pytest
+from configs.config import get_config
+from services.chunk_aggregator import ChunkResultAggregator
+from services.tagging_service import TaggingService
+
+@pytest.fixture(scope="module")
+def service():
+    return TaggingService(get_config())
+
+def _baseline_combine(service, chunk_results):
+    """combine_chunk_results before the streaming aggregator: float sums over the full result list"""
+    combined = service._get_empty_result()
+    occurrences = {category: {} for category in combined["abstractive"]}
+    for result in chunk_results:
+        if not isinstance(result, dict) or "abstractive" not in result:
+            continue
+        for category in occurrences:
+            for tag, score in result["abstractive"].get(category, {}).items():
+                if score >= 0.3:
+                    occurrences[category].setdefault(tag, []).append(score)
+
+    for category, tags in occurrences.items():
+        if not tags:
+            continue
+        category_tags = {tag: sum(scores) / len(scores) * (len(scores) / len(chunk_results)) for tag, scores in tags.items()}
+        total_raw_score = sum(category_tags.values())
+        if total_raw_score > 0:
+            category_tags = {tag: round(score / total_raw_score * 100, 1) for tag, score in category_tags.items()}
+        if category == "clinical topic":
+            category_tags = service._renormalize_hierarchical_clinical_tags(
+                service._create_hierarchical_clinical_topic_structure(category_tags))
+        combined["abstractive"][category] = category_tags
+    return combined
+
+def _baseline_distribution(chunk_results):
+    def weighted(topic):
+        scores = [score for result in chunk_results for score in result["abstractive"].get(topic, {}).values() if score >= 0.3]
+        avg_confidence = sum(scores) / len(scores) if scores else 0.0
+        return avg_confidence * sum(1 for result in chunk_results if result["abstractive"].get(topic)) / len(chunk_results)
+
+    clinical, non_clinical = weighted("clinical topic"), weighted("non clinical topics")
+    total = clinical + non_clinical
+    if total == 0:
+        return {"clinical": 0.0, "non_clinical": 0.0}
+    clinical_percentage = round(clinical / total * 100, 1)
+    non_clinical_percentage = round(non_clinical / total * 100, 1)
+    if clinical_percentage + non_clinical_percentage != 100.0:
+        diff = 100.0 - (clinical_percentage + non_clinical_percentage)
+        if abs(diff) <= 0.1:
+            if clinical_percentage >= non_clinical_percentage:
+                clinical_percentage += diff
+            else:
+                non_clinical_percentage += diff
+        clinical_percentage = max(0.0, round(clinical_percentage, 1))
+        non_clinical_percentage = max(0.0, round(non_clinical_percentage, 1))
+    return {"clinical": clinical_percentage, "non_clinical": non_clinical_percentage}
+
+def test_streaming_aggregate_matches_baseline(service):
+    rng = random.Random(7)
+    names = {category: list(info["subtags"]) + [nested for subtag in info["subtags"].values()
+                                                for nested in subtag.get("nested_subtags", {})]
+             for category, info in service.parsed_abs_tags.items()}
+    for _ in range(2000):
+        chunk_results = []
+        for _ in range(rng.randint(1, 30)):
+            result = service._get_empty_result()
+            for category, tags in result["abstractive"].items():
+                for _ in range(rng.randint(0, 4)):
+                    tags[rng.choice(names[category])] = round(rng.random(), 2)
+            chunk_results.append(result)
+
+        completion_order = list(enumerate(chunk_results))
+        rng.shuffle(completion_order)
+        aggregator = ChunkResultAggregator()
+        for chunk_index, result in completion_order:
+            aggregator.add(result, chunk_index)
+
+        expected = (_baseline_combine(service, chunk_results), _baseline_distribution(chunk_results))
+        actual = (service._combine_aggregate(aggregator), aggregator.content_distribution())
+        # Compared as JSON so tag order counts too
+        assert json.dumps(actual) == json.dumps(expected)
@@ -0,0 +1,116 @@
+import time
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from openai import RateLimitError
+from configs.config import get_config
+from services.rate_limiter import AdaptiveRateLimiter, TokenBucket
+from services.tagging_service import TaggingService
+
+class FailingCompletions:
+    """Answers every chunk after a short delay, except the one containing `fail_on`, which raises"""
+
+    def __init__(self, fail_on: str):
+        self.fail_on = fail_on
+
+    async def create(self, **kwargs):
+        if self.fail_on in kwargs["messages"][-1]["content"]:
+            raise ValueError("chunk failed")
+        await asyncio.sleep(0.2)
+        message = SimpleNamespace(content='{"abstractive": {}}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def test_failed_chunk_releases_every_limiter_slot():
+    async def run():
+        service = TaggingService(get_config())
+        service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=FailingCompletions("chunk 3")))
+        text = "\n\n".join(f"chunk {i} " + "word " * 50 for i in range(6))
+        with pytest.raises(Exception):
+            await service.tag_document(text, chunk_tokens=100)
+        await asyncio.sleep(0)
+        assert service.rate_limiter.in_flight == 0
+
+        # The limiter still admits calls afterwards
+        service.openai_client.chat.completions.fail_on = "never"
+        assert await asyncio.wait_for(service.tag_chunk("chunk 7"), timeout=5) is not None
+
+    asyncio.run(run())
+
+class RateLimitedCompletions:
+    """Fake OpenAI endpoint: answers 429 with the given headers for the first `failures` calls, then succeeds"""
+
+    def __init__(self, failures: int, headers: dict):
+        self.failures = failures
+        self.headers = headers
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            request = httpx.Request("POST", "https://api.openai.test/v1/chat/completions")
+            response = httpx.Response(429, headers=self.headers, request=request)
+            raise RateLimitError("Rate limit reached", response=response, body=None)
+        message = SimpleNamespace(content='{"abstractive": {}}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=50))
+
+def _completion_kwargs():
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": "hello"}], "max_tokens": 10}
+
+@pytest.mark.parametrize("headers, delay", [({"retry-after-ms": "300"}, 0.3), ({"retry-after": "0.4"}, 0.4)])
+def test_429_pauses_for_retry_after_and_halves_concurrency(headers, delay):
+    async def run():
+        service = TaggingService(get_config())
+        completions = RateLimitedCompletions(1, headers)
+        service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        limiter = service.rate_limiter
+        initial_limit = limiter.concurrency_limit
+
+        start = time.monotonic()
+        response = await service._create_completion(**_completion_kwargs())
+        elapsed = time.monotonic() - start
+
+        assert response.usage.total_tokens == 50
+        assert completions.calls == 2
+        assert elapsed >= delay
+        assert limiter.rate_limited_count == 1
+        assert limiter.concurrency_limit < initial_limit
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+def test_concurrency_limit_recovers_after_backoff():
+    async def run():
+        limiter = AdaptiveRateLimiter(requests_per_minute=10000, tokens_per_minute=10**7,
+                                      max_concurrency=8, initial_concurrency=4)
+        limiter.backoff(retry_after=0.1)
+        assert int(limiter.concurrency_limit) == 2
+        assert limiter.stats()["paused_for_seconds"] > 0
+
+        start = time.monotonic()
+        for _ in range(10):
+            async with limiter.slot(10) as outcome:
+                outcome["success"] = True
+        assert time.monotonic() - start >= 0.1
+        assert limiter.concurrency_limit >= 4
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+def test_token_bucket_delays_admission():
+    async def run():
+        # 600 tokens per minute refill at 10 per second
+        limiter = AdaptiveRateLimiter(requests_per_minute=10000, tokens_per_minute=600, max_concurrency=4)
+        async with limiter.slot(600) as outcome:
+            outcome["success"] = True
+        start = time.monotonic()
+        async with limiter.slot(3) as outcome:
+            outcome["success"] = True
+        assert time.monotonic() - start >= 0.25
+
+        bucket = TokenBucket(60)
+        bucket.consume(60)
+        assert 0.9 <= bucket.wait_time(1) <= 1.0
+
+    asyncio.run(run())
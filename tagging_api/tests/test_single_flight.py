@@ -0,0 +1,84 @@
+import copy
+import asyncio
+from pymongo.errors import DuplicateKeyError
+from utils.single_flight import MongoLease
+
+def _matches(document, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(document, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict) and "$lt" in condition:
+            if field not in document or not document[field] < condition["$lt"]:
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+class MemoryCollection:
+    """Just enough of the Motor collection API for MongoLease"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def insert_one(self, document):
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("duplicate key")
+        self.documents[document["_id"]] = copy.deepcopy(document)
+
+    async def find_one(self, query, projection=None):
+        for document in self.documents.values():
+            if _matches(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    async def update_one(self, query, update):
+        await self.find_one_and_update(query, update)
+
+    async def find_one_and_update(self, query, update):
+        for document in self.documents.values():
+            if _matches(document, query):
+                before = copy.deepcopy(document)
+                document.update(update.get("$set", {}))
+                for field in update.get("$unset", {}):
+                    document.pop(field, None)
+                return before
+        return None
+
+    async def delete_one(self, query):
+        for key, document in list(self.documents.items()):
+            if _matches(document, query):
+                del self.documents[key]
+                return
+
+def test_followers_share_the_running_leaders_result():
+    async def run():
+        lease = MongoLease(MemoryCollection(), poll_interval=0.01)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return len(calls)
+
+        results = await asyncio.gather(*(lease.run("doc", work) for _ in range(5)))
+        assert results == [1] * 5
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+def test_call_after_completion_runs_again():
+    async def run():
+        lease = MongoLease(MemoryCollection(), result_seconds=30, poll_interval=0.01)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        assert await lease.run("doc", work) == 1
+        # The finished lease is still stored, but a new call must not be served the old result
+        assert await lease.run("doc", work) == 2
+        assert len(calls) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+import random
+import pytest
+from configs.config import get_config
+from services.tagging_service import TaggingService
+from utils.text_chunker import character_chunk_count
+
+WORDS = ("patients treatment dose efficacy clinical trial outcome safety adverse events were "
+         "reported in the study cohort receiving therapy daily HbA1c mg/kg").split()
+
+def _corpus():
+    """Fixed documents of numeric clinical prose with markdown tables mixed in"""
+    rng = random.Random(12)
+
+    def sentence():
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize()
+        return words + rng.choice([".", f" ({rng.randint(1, 99)}.{rng.randint(0, 9)}%).", f" (p<0.0{rng.randint(1, 5)})."])
+
+    def table():
+        rows = ["| Arm | n | Dose | Response |", "|---|---|---|---|"]
+        rows += [f"| {rng.choice(WORDS)} | {rng.randint(10, 999)} | {rng.randint(1, 50)} mg | {rng.randint(1, 99)}.{rng.randint(0, 9)}% |"
+                 for _ in range(rng.randint(3, 25))]
+        return "\n".join(rows)
+
+    return ["\n\n".join(table() if rng.random() < 0.2 else " ".join(sentence() for _ in range(rng.randint(1, 8)))
+                        for _ in range(rng.randint(5, 120)))
+            for _ in range(30)]
+
+@pytest.fixture(scope="module")
+def service():
+    return TaggingService(get_config())
+
+@pytest.mark.parametrize("chunk_size", [1000, 2000, 5000])
+def test_no_more_chunks_than_character_splitter(service, chunk_size):
+    for text in _corpus():
+        assert len(service.chunk_text(text, chunk_size)) <= character_chunk_count(text, chunk_size)
+
+def test_prose_words_are_kept_in_order(service):
+    text = "\n\n".join(block for document in _corpus() for block in document.split("\n\n") if not block.startswith("|"))
+    assert " ".join(service.chunk_text(text, 1000)).split() == text.split()
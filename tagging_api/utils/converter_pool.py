@@ -0,0 +1,226 @@
+import os
+import asyncio
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from configs.config import DOCLING_WARMUP, DOCLING_WORKERS, EXTRACTION_QUEUE_DEPTH, EXTRACTION_TIERING
+from loggers.logger import logging
+
+def default_pdf_pipeline_options() -> PdfPipelineOptions:
+    pipeline_options = PdfPipelineOptions(do_table_structure=True)
+    pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
+    return pipeline_options
+
+def fast_pdf_pipeline_options() -> PdfPipelineOptions:
+    """Layout analysis only, for text-native pages: no OCR and no TableFormer table structure"""
+    return PdfPipelineOptions(do_ocr=False, do_table_structure=False)
+
+def tier_pipeline_options(tier: str) -> PdfPipelineOptions:
+    return fast_pdf_pipeline_options() if tier == "fast" else default_pdf_pipeline_options()
+
+def warmup_option_sets() -> List[PdfPipelineOptions]:
+    option_sets = [default_pdf_pipeline_options()]
+    if EXTRACTION_TIERING:
+        option_sets.append(fast_pdf_pipeline_options())
+    return option_sets
+
+class DocumentConverterPool:
+    """Process-wide docling converters keyed by their PDF pipeline options.
+
+    Building a converter is cheap but its layout, OCR and table models load on first use, so
+    converters are kept for reuse and `warm` loads the models ahead of the first request.
+    """
+
+    def __init__(self):
+        self._converters: Dict[str, DocumentConverter] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+        self.warmup_error: Optional[str] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def get(self, pipeline_options: Optional[PdfPipelineOptions] = None) -> DocumentConverter:
+        pipeline_options = pipeline_options or default_pdf_pipeline_options()
+        key = pipeline_options.model_dump_json()
+        with self._lock:
+            converter = self._converters.get(key)
+            if converter is None:
+                converter = DocumentConverter(
+                    format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+                )
+                self._converters[key] = converter
+            return converter
+
+    def warm(self, option_sets: Optional[List[PdfPipelineOptions]] = None):
+        """Build the converters for the given options (those of every enabled tier otherwise) and load their models"""
+        start = time.perf_counter()
+        try:
+            for pipeline_options in option_sets or warmup_option_sets():
+                self.get(pipeline_options).initialize_pipeline(InputFormat.PDF)
+        except Exception as e:
+            self.warmup_error = str(e)
+            logging.info(f"Docling model warm-up failed: {e}")
+            return
+        self.warmup_seconds = time.perf_counter() - start
+        self.ready = True
+        logging.info(f"Docling models warmed in {self.warmup_seconds:.1f}s")
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "converters": len(self._converters),
+            "warmup_seconds": round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+            "warmup_error": self.warmup_error
+        }
+
+converter_pool = DocumentConverterPool()
+
+class ExtractionOverloaded(Exception):
+    """Raised when the conversion queue is full; callers should answer 503 and let the client retry"""
+
+def _init_conversion_worker():
+    converter_pool.warm()
+
+def _worker_ready():
+    """Readiness probe answered by a worker as (pid, warmed); it holds the worker briefly so probes spread across workers"""
+    time.sleep(0.1)
+    return os.getpid(), converter_pool.warmup_error is None
+
+class ConversionExecutor:
+    """Bounded pool of worker processes that run docling conversions off the event loop.
+
+    Each worker warms its own converter when it starts, so conversions never pay the model
+    load. At most `max_workers` conversions run and `max_queue_depth` more may wait; beyond
+    that `run` raises ExtractionOverloaded instead of queueing. A pool broken by a dying
+    worker is replaced and re-warmed. With no workers configured, conversions run in a
+    thread of this process instead.
+    """
+
+    def __init__(self, max_workers: int, max_queue_depth: int, warm_workers: bool = True):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.warm_workers = warm_workers
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.ready = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._rewarm: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Create the worker pool; workers spawn on first use, or right away through wait_ready"""
+        if self.max_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_conversion_worker if self.warm_workers else None)
+        elif not self.warm_workers:
+            self.ready = True
+
+    async def wait_ready(self):
+        """Spawn every worker and wait until each of them has answered a probe with its models loaded"""
+        pool = self._pool
+        if pool is None:
+            if self.warm_workers:
+                await asyncio.to_thread(converter_pool.warm)
+                self.ready = converter_pool.ready
+            return
+        loop = asyncio.get_running_loop()
+        workers = {}
+        try:
+            # A warm worker can answer several probes while another is still loading, so keep
+            # probing until every worker process has answered at least once
+            while len(workers) < self.max_workers:
+                answers = await asyncio.gather(*[loop.run_in_executor(pool, _worker_ready)
+                                                 for _ in range(self.max_workers)])
+                workers.update(answers)
+        except BrokenProcessPool:
+            return
+        if pool is self._pool:
+            self.ready = all(workers.values())
+            logging.info(f"{len(workers)} conversion workers started, ready: {self.ready}")
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor):
+        """A worker died (e.g. out of memory): replace the pool and report not ready until the new workers are warm"""
+        if self._pool is not broken:
+            return
+        logging.warning("A conversion worker died, restarting the conversion pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.ready = False
+        self.restarts += 1
+        self.start()
+        self._rewarm = asyncio.ensure_future(self.wait_ready())
+
+    async def _submit(self, fn: Callable, *args) -> Any:
+        pool = self._pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            raise
+
+    def shutdown(self):
+        if self._rewarm is not None and not self._rewarm.done():
+            self._rewarm.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def check_capacity(self, width: int = 1):
+        """Reject when admitting `width` more jobs would overflow the workers plus the queue"""
+        if self.pending + width > self.max_workers + self.max_queue_depth:
+            self.rejected += 1
+            raise ExtractionOverloaded(f"{self.pending} conversions already running or queued")
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in a conversion worker; fn and its result must be picklable"""
+        self.check_capacity()
+        self.pending += 1
+        try:
+            if self._pool is None:
+                return await asyncio.to_thread(fn, *args)
+            return await self._submit(fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def run_many(self, fn: Callable, arg_sets: List[tuple]) -> List[Any]:
+        """Run fn over every argument tuple in the workers, results in order.
+
+        The batch is admitted as one conversion and keeps at most one job per worker in the
+        pool at a time, so it only counts for the jobs it actually runs at once.
+        """
+        width = min(len(arg_sets), max(1, self.max_workers))
+        self.check_capacity(width)
+        self.pending += width
+        try:
+            if self._pool is None:
+                return [await asyncio.to_thread(fn, *args) for args in arg_sets]
+            slots = asyncio.Semaphore(width)
+
+            async def run_one(args):
+                async with slots:
+                    return await self._submit(fn, *args)
+
+            results = await asyncio.gather(*[run_one(args) for args in arg_sets], return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            return results
+        finally:
+            self.pending -= width
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "restarts": self.restarts,
+            "max_queue_depth": self.max_queue_depth,
+            "rejected": self.rejected
+        }
+
+conversion_executor = ConversionExecutor(DOCLING_WORKERS, EXTRACTION_QUEUE_DEPTH, DOCLING_WARMUP)
@@ -1,10 +1,8 @@
 import sys
 import re
-import fitz  # PyMuPDF
 from langdetect import detect, DetectorFactory
 from db.languages import LANGDETECT_LANGUAGE_CODES
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from multiprocessing import cpu_count
+from utils.pdf_scan import scan_pdf
 from loggers.logger import logging
 from loggers.exception import CustomException
 
@@ -49,20 +47,18 @@ class LanguageDetector():
         except Exception as e:
             raise CustomException(e, sys)
 
-    async def detect_languages(self, pdf_path: str) -> dict:
-        """Main detection function with multiprocessing"""
+    def page_language(self, page_number: int, text: str):
+        """Per-page consumer for scan_pdf: detect the language of one page as soon as it is read"""
+        return self.extract_text_from_page_fitz((page_number, clean_text(text)))
+
+    async def detect_languages(self, pdf_path: str, scan=None) -> dict:
+        """Aggregate per-page languages, from a scan_pdf pass made with page_language or a new one"""
         
         try:
             logging.info("language detection initiated.")
-            doc = fitz.open(pdf_path)
-            page_texts = [(i, clean_text(page.get_text())) for i, page in enumerate(doc)]
-
-            fitz_results = []
-            with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
-                futures = [executor.submit(self.extract_text_from_page_fitz, page) for page in page_texts]
-                
-                for future in as_completed(futures):
-                    fitz_results.append(future.result())
+            if scan is None:
+                scan = scan_pdf(pdf_path, self.page_language)
+            fitz_results = scan['page_text_results']
             logging.info("Language detection under process...")
             fallback_pages = [i for i, _, _, has_text in fitz_results if not has_text]
             logging.info(f"Page remaining: {len(fallback_pages)}")
@@ -82,7 +78,6 @@ class LanguageDetector():
                 languages.append("English")
                 lang_codes.append('en')
             logging.info("Language detection complete.")
-            doc.close()
 
             return {
                 "lang_codes": lang_codes,
@@ -1,19 +1,17 @@
 from datetime import datetime
 import os
 import re
-import fitz   # PyMUPDF
 import sys
-from docling.datamodel.base_models import InputFormat
-from concurrent.futures import ThreadPoolExecutor
-from docling.document_converter import DocumentConverter, PdfFormatOption
 from multiprocessing import Manager
 from loggers.logger import logging
 from loggers.exception import CustomException
-from collections import defaultdict
+from collections import Counter, defaultdict
 from statistics import mean
 from utils.summary_gen import text_summarization
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+from utils.pdf_scan import scan_pdf
+from configs.config import DOCLING_PAGE_RANGE_SIZE, DOCLING_SPLIT_MIN_PAGES
+from utils.converter_pool import converter_pool, conversion_executor, tier_pipeline_options, ExtractionOverloaded
+from utils.page_classifier import FULL_TIER, tier_runs
 
 def filesize_mb(value):
     return round(value / (1024 * 1024), 2)
@@ -24,43 +22,6 @@ def remove_img_tag(text):
     except Exception as e:
         raise CustomException(e, sys)
 
-async def extract_metadata_granular(pdf_document):
-    try:
-        if pdf_document != None:
-            text_properties = []
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                text_blocks = page.get_text("dict")
-                for block in text_blocks.get("blocks",[]):
-                    for line in block.get("lines",[]):
-                        for span in line.get("spans",[]):
-                            try:
-                                font_size = span["size"]
-                                font_color = span["color"]
-                                font_style = span["font"]
-                                text = span["text"]
-                                text_properties.append({
-                                    "font_size": font_size,
-                                    "font_color": font_color,
-                                    "font_style": font_style
-                                })
-                            except:pass
-
-            properties = {
-                'font_size': {},
-                'font_color': {},
-                'font_style': {}
-            }
-
-            for prop in text_properties:
-                properties['font_size'][prop['font_size']] = properties['font_size'].get(prop['font_size'], 0) + 1
-                properties['font_color'][prop['font_color']] = properties['font_color'].get(prop['font_color'], 0) + 1
-                properties['font_style'][prop['font_style']] = properties['font_style'].get(prop['font_style'], 0) + 1
-
-            return properties
-    except Exception as e:
-        raise CustomException(e, sys)
-
 def calculate_distribution_percentage(value):
     if value != {}:
         try:
@@ -85,40 +46,11 @@ def clean_document_date(pdf_date_str):
     except ValueError:
         return ""
 
-def process_page_for_dpi(page):
-    try:
-        images = page.get_images(full=True)
-        if not images:
-            return []
-
-        dpis = []
-
-        for img in images:
-            xref = img[0]
-            pix = fitz.Pixmap(page.parent, xref)
-
-            if pix.n > 4:
-                pix = fitz.Pixmap(fitz.csRGB, pix)
-
-            dpi_x = pix.width / (page.rect.width / 72)
-            dpi_y = pix.height / (page.rect.height / 72)
-            avg_dpi = (dpi_x + dpi_y) / 2
-
-            dpis.append(avg_dpi)
-
-        return dpis
-    except Exception as e:
-        return []
-
-async def get_overall_dpi(pdf_path):
+async def get_overall_dpi(pdf_path, scan=None):
     try:
-        doc = fitz.open(pdf_path)
-
-        with ThreadPoolExecutor() as executor:
-            results = executor.map(process_page_for_dpi, doc)
-
-        all_dpis = [dpi for dpi_list in results for dpi in dpi_list]
-        doc.close()
+        if scan is None:
+            scan = scan_pdf(pdf_path)
+        all_dpis = scan['image_dpis']
 
         if not all_dpis:
             return None
@@ -127,25 +59,12 @@ async def get_overall_dpi(pdf_path):
     except Exception as e:
         raise CustomException(e, sys)
 
-async def words_paragraphs_lines_extract(result, page_count):
+async def extract_metadata(pdf_path, scan=None):
     try:
-        num_lines = 0
-        num_words = 0
-        num_paras = 0
-        for page_no in range(1, result.document.num_pages() + 1):
-            texts = result.document.export_to_markdown(page_no=page_no)
-            num_lines += len(re.split(r'\n\n|\n', texts.strip()))
-            num_paras += len(texts.split('\n\n'))
-            num_words += len(texts.split())
-        return num_lines, num_words, num_paras
-    except Exception as e:
-        raise CustomException(e, sys)
-
-async def extract_metadata(pdf_path):
-    try:
-        pdf_document = fitz.open(pdf_path)
-        pdf_metadata_overview = pdf_document.metadata
-        pdf_metadata_granular = await extract_metadata_granular(pdf_document)
+        if scan is None:
+            scan = scan_pdf(pdf_path)
+        pdf_metadata_overview = scan['metadata']
+        pdf_metadata_granular = scan['font_properties']
         metadata = {**pdf_metadata_overview,
                     **pdf_metadata_granular}
         metadata['font_size'] = {f"{k:.2f}": v for k, v in metadata['font_size'].items()}
@@ -160,58 +79,116 @@ async def extract_metadata(pdf_path):
 
         logging.info("Metadata(pymupdf) is extracted from document.")
 
-        pdf_document.close()
-
         return metadata
     except Exception as e:
         logging.info("Failed to extract metadata.")
         raise CustomException(e, sys)
 
-async def extract_metadata_docling(pdf_path):
+def _label(item) -> str:
+    return getattr(item.label, 'value', item.label)
+
+def page_ranges(first_page, last_page, range_size):
+    return [(start, min(start + range_size - 1, last_page)) for start in range(first_page, last_page + 1, range_size)]
+
+def conversion_jobs(page_count, page_tiers=None):
+    """(page range, tier) per conversion: one per run of same-tier pages, cut into page ranges for large PDFs.
+
+    A single job covering the whole PDF gets no page range, so it converts exactly as before.
+    """
+    if not page_count:
+        return [(None, FULL_TIER)]
+    runs = tier_runs(page_tiers) if page_tiers else [(1, page_count, FULL_TIER)]
+    split = DOCLING_PAGE_RANGE_SIZE > 0 and page_count >= DOCLING_SPLIT_MIN_PAGES
+    jobs = []
+    for first_page, last_page, tier in runs:
+        if split:
+            jobs.extend((page_range, tier) for page_range in page_ranges(first_page, last_page, DOCLING_PAGE_RANGE_SIZE))
+        else:
+            jobs.append(((first_page, last_page), tier))
+    if len(jobs) == 1:
+        return [(None, jobs[0][1])]
+    return jobs
+
+def convert_document(pdf_path, page_range=None, tier=FULL_TIER):
+    """Runs in a conversion worker: convert with the worker's warm converter and return only the compact fields extraction keeps.
+
+    With a (first, last) page_range only those pages are converted and reported; page numbers stay those of the whole PDF.
+    The fast tier converts without OCR and table structure, and every page reports the tier it went through.
+    """
+    converter = converter_pool.get(tier_pipeline_options(tier))
+    result = converter.convert(pdf_path, page_range=page_range) if page_range else converter.convert(pdf_path)
+    document = result.document
+
+    page_picture_count = defaultdict(int)
+    page_table_count = defaultdict(int)
+    total_pictures = 0
+    total_tables = 0
+    for picture in document.pictures:
+        if _label(picture) == 'picture':
+            page_no = picture.prov[0].page_no
+            page_picture_count[page_no] += 1
+            total_pictures += 1
+
+    for table in document.tables:
+        if _label(table) == 'table':
+            page_no = table.prov[0].page_no
+            page_table_count[page_no] += 1
+            total_tables += 1
+
+    page_count = result.input.page_count
+    first_page, last_page = page_range or (1, page_count)
+    output = {"pages": {}}
+    num_lines = 0
+    num_words = 0
+    num_paras = 0
+    for page in range(first_page, last_page+1):
+        texts = document.export_to_markdown(page_no=page)
+        num_lines += len(re.split(r'\n\n|\n', texts.strip()))
+        num_paras += len(texts.split('\n\n'))
+        num_words += len(texts.split())
+        output["pages"][f"page_{page}"] = { 
+            "figures": page_picture_count.get(page, 0),
+            "tables": page_table_count.get(page, 0),
+            "text": remove_img_tag(texts),
+            "tier": tier
+        }
+    output["figure_count"] = total_pictures
+    output["table_count"] = total_tables
+    output['page_count'] = page_count
+    output['filesize'] = filesize_mb(result.input.filesize)
+    output['text'] = remove_img_tag(document.export_to_markdown())
+    output['plain_text'] = document.export_to_text()
+    output['lines'], output['words'], output['paragraphs'] = num_lines, num_words, num_paras
+    return output
+
+def merge_range_outputs(outputs):
+    """Combine per-range conversion outputs, in page order, into the shape of a whole-document conversion"""
+    merged = {"pages": {}}
+    for output in outputs:
+        merged["pages"].update(output["pages"])
+    for key in ("figure_count", "table_count", "lines", "words", "paragraphs"):
+        merged[key] = sum(output[key] for output in outputs)
+    merged['page_count'] = outputs[0]['page_count']
+    merged['filesize'] = outputs[0]['filesize']
+    merged['text'] = "\n\n".join(output['text'] for output in outputs if output['text'])
+    merged['plain_text'] = "\n\n".join(output['plain_text'] for output in outputs if output['plain_text'])
+    return merged
+
+async def extract_metadata_docling(pdf_path, page_count=None, page_tiers=None):
     try:
-        pipeline_options = PdfPipelineOptions(do_table_structure=True)
-        pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
-
-        doc_converter = DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-        )
-
-        result = doc_converter.convert(pdf_path)
-        data = result.model_dump()
-
-        page_picture_count = defaultdict(int)
-        page_table_count = defaultdict(int)
-        total_pictures = 0
-        total_tables = 0
-        for picture in data['document']['pictures']:
-            if picture.get('label') == 'picture':
-                page_no = picture['prov'][0]['page_no']
-                page_picture_count[page_no] += 1
-                total_pictures += 1
-                
-        for picture in data['document']['tables']:
-            if picture.get('label') == 'table':
-                page_no = picture['prov'][0]['page_no']
-                page_table_count[page_no] += 1
-                total_tables += 1
-        
-        output = {"pages": {}}
-        for page in range(1, data['input']['page_count']+1):
-            output["pages"][f"page_{page}"] = { 
-                "figures": page_picture_count.get(page, 0),
-                "tables": page_table_count.get(page, 0),
-                "text": remove_img_tag(result.document.export_to_markdown(page_no=page))
-            }
-        output["figure_count"] = total_pictures
-        output["table_count"] = total_tables
-        output['page_count'] = data['input']['page_count']
-        output['filesize'] = filesize_mb(data['input']['filesize'])
-        output['text'] = remove_img_tag(result.document.export_to_markdown())
-        output['summary'] = await text_summarization(result.document.export_to_text())
-        output['lines'], output['words'], output['paragraphs'] = await words_paragraphs_lines_extract(result, output['page_count'])
+        jobs = conversion_jobs(page_count, page_tiers)
+        if len(jobs) > 1:
+            logging.info(f"Converting {page_count} pages in {len(jobs)} parallel conversions")
+            outputs = await conversion_executor.run_many(convert_document, [(pdf_path, page_range, tier) for page_range, tier in jobs])
+            output = merge_range_outputs(outputs)
+        else:
+            output = await conversion_executor.run(convert_document, pdf_path, None, jobs[0][1])
+        output['tiers'] = dict(Counter(page['tier'] for page in output['pages'].values()))
+        output['summary'] = await text_summarization(output.pop('plain_text'))
 
         return output
+    except ExtractionOverloaded:
+        raise
     except Exception as e:
         logging.info("Failed to extract metadata from Docling.")
         raise CustomException(e, sys)
\ No newline at end of file
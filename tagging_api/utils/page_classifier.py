@@ -0,0 +1,36 @@
+from typing import Dict, List
+
+FAST_TIER = "fast"
+FULL_TIER = "full"
+
+def classify_pages(page_stats: List[Dict], min_chars: int, max_image_coverage: float,
+                   min_fast_run: int = 1, max_runs: int = 0) -> List[str]:
+    """Pick an extraction tier per page from the PyMuPDF scan's text and image statistics.
+
+    A page is text-native, and goes to the fast tier, when it has at least `min_chars` of
+    extractable text and images cover at most `max_image_coverage` of it. Anything else may
+    be scanned or image-heavy and goes to the full tier. Runs of fast pages shorter than
+    `min_fast_run` are folded into the full tier, which merges the full runs around them.
+    Each run becomes its own conversion, so when more than `max_runs` runs remain the whole
+    document goes to the full tier as a single conversion.
+    """
+    tiers = [FAST_TIER if stats["text_chars"] >= min_chars and stats["image_coverage"] <= max_image_coverage
+             else FULL_TIER for stats in page_stats]
+
+    for first_page, last_page, tier in tier_runs(tiers):
+        if tier == FAST_TIER and last_page - first_page + 1 < min_fast_run:
+            tiers[first_page - 1:last_page] = [FULL_TIER] * (last_page - first_page + 1)
+
+    if max_runs and len(tier_runs(tiers)) > max_runs:
+        return [FULL_TIER] * len(tiers)
+    return tiers
+
+def tier_runs(tiers: List[str]) -> List[tuple]:
+    """Consecutive pages sharing a tier as (first page, last page, tier), pages numbered from 1"""
+    runs = []
+    for page_no, tier in enumerate(tiers, start=1):
+        if runs and runs[-1][2] == tier:
+            runs[-1] = (runs[-1][0], page_no, tier)
+        else:
+            runs.append((page_no, page_no, tier))
+    return runs
@@ -0,0 +1,66 @@
+import sys
+import fitz   # PyMUPDF
+from typing import Any, Callable, Dict, Optional
+from loggers.logger import logging
+from loggers.exception import CustomException
+
+def scan_pdf(pdf_path: str, on_page_text: Optional[Callable[[int, str], Any]] = None) -> Dict:
+    """Walk a PDF once, page by page, collecting everything the PyMuPDF extraction stages need.
+
+    Each page gets a single text page that serves both the span walk (font statistics) and the
+    plain text, which is handed to `on_page_text` right away so only one page is held at a time.
+    Image sizes come from the page's image list and image coverage from the image placements,
+    without decoding the images.
+    """
+    try:
+        pdf_document = fitz.open(pdf_path)
+        try:
+            font_properties = {'font_size': {}, 'font_color': {}, 'font_style': {}}
+            page_text_results = []
+            image_dpis = []
+            page_stats = []
+            for page_index, page in enumerate(pdf_document):
+                # TEXTFLAGS_TEXT leaves image blocks out of the "dict" walk, which only reads text spans
+                textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+                for block in page.get_text("dict", textpage=textpage).get("blocks", []):
+                    for line in block.get("lines", []):
+                        for span in line.get("spans", []):
+                            try:
+                                span_properties = (('font_size', span["size"]), ('font_color', span["color"]),
+                                                   ('font_style', span["font"]))
+                            except KeyError:
+                                continue
+                            for prop, value in span_properties:
+                                font_properties[prop][value] = font_properties[prop].get(value, 0) + 1
+
+                page_text = page.get_text(textpage=textpage)
+                if on_page_text is not None:
+                    page_text_results.append(on_page_text(page_index, page_text))
+
+                page_area = abs(page.rect) or 1
+                image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+                page_stats.append({
+                    "text_chars": len(page_text.strip()),
+                    "image_coverage": min(1.0, image_area / page_area)
+                })
+
+                page_width_inches = page.rect.width / 72
+                page_height_inches = page.rect.height / 72
+                for image in page.get_images(full=True):
+                    width, height = image[2], image[3]
+                    image_dpis.append((width / page_width_inches + height / page_height_inches) / 2)
+                del textpage
+
+            logging.info("PDF scanned in a single pass.")
+            return {
+                "metadata": pdf_document.metadata,
+                "page_count": pdf_document.page_count,
+                "font_properties": font_properties,
+                "page_text_results": page_text_results,
+                "image_dpis": image_dpis,
+                "page_stats": page_stats
+            }
+        finally:
+            pdf_document.close()
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,132 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from loggers.logger import logging
+
+class MongoLease:
+    """Cross-worker leader election for SingleFlight keys through a Mongo collection.
+
+    The leader holds a lease document keyed by the call key and renews it while it runs.
+    Workers that lose the race poll the document and pick up the result of the leader they saw
+    running; it is kept for `result_seconds` so slow pollers still find it. A call arriving
+    after completion takes the finished lease over and runs again rather than reusing the old
+    result. A lease that expires because its leader died is taken over by the next poller; a
+    leader that fails drops the lease so a poller retries.
+    """
+
+    def __init__(self, collection, lease_seconds: int = 900, result_seconds: int = 30,
+                 poll_interval: float = 0.5):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.result_seconds = result_seconds
+        self.poll_interval = poll_interval
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def _expires_at(self, seconds: int) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+    async def _acquire(self, key: str, owner: str, replace_done: bool) -> bool:
+        running = {"owner": owner, "status": "running", "expires_at": self._expires_at(self.lease_seconds)}
+        try:
+            await self.collection.insert_one({"_id": key, **running})
+            return True
+        except DuplicateKeyError:
+            pass
+        takeable = [{"expires_at": {"$lt": datetime.now(timezone.utc)}}]
+        if replace_done:
+            takeable.append({"status": "done"})
+        taken = await self.collection.find_one_and_update(
+            {"_id": key, "$or": takeable},
+            {"$set": running, "$unset": {"result": ""}}
+        )
+        return taken is not None
+
+    async def _renew(self, key: str, owner: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.collection.update_one(
+                {"_id": key, "owner": owner},
+                {"$set": {"expires_at": self._expires_at(self.lease_seconds)}}
+            )
+
+    async def _lead(self, key: str, owner: str, fn: Callable[[], Awaitable[Any]]):
+        renewal = asyncio.ensure_future(self._renew(key, owner))
+        try:
+            result = await fn()
+        except BaseException:
+            await self.collection.delete_one({"_id": key, "owner": owner})
+            raise
+        finally:
+            renewal.cancel()
+        try:
+            await self.collection.update_one(
+                {"_id": key, "owner": owner},
+                {"$set": {"status": "done", "result": result, "expires_at": self._expires_at(self.result_seconds)}}
+            )
+        except Exception as e:
+            logging.warning(f"Publishing single-flight result for {key} failed: {e}")
+            await self.collection.delete_one({"_id": key, "owner": owner})
+        return result
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        owner = uuid.uuid4().hex
+        leader = None
+        while True:
+            # A caller already following a leader must not replace the result it is waiting for
+            if await self._acquire(key, owner, replace_done=leader is None):
+                return await self._lead(key, owner, fn)
+            document = await self.collection.find_one({"_id": key}, {"owner": 1, "status": 1, "result": 1})
+            if document is None:
+                continue
+            if document.get("status") == "done":
+                # Only a result from the run we waited on is fresh; an older one is taken over
+                if leader is not None and document.get("owner") == leader:
+                    return document["result"]
+                leader = None
+                continue
+            leader = document.get("owner")
+            await asyncio.sleep(self.poll_interval)
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key so only one of them does the work.
+
+    The first caller starts the call as a task and later callers await the same task. The
+    task is shielded, so a caller that disconnects does not cancel the work for the others.
+    With a MongoLease the coalescing also spans uvicorn workers.
+    """
+
+    def __init__(self, lease: Optional[MongoLease] = None):
+        self.lease = lease
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leader_count = 0
+        self.follower_count = 0
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        task = self._calls.get(key)
+        if task is None:
+            self.leader_count += 1
+            call = self.lease.run(key, fn) if self.lease is not None else fn()
+            task = asyncio.ensure_future(call)
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.follower_count += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leader_count,
+            "followers": self.follower_count,
+            "cross_worker": self.lease is not None
+        }
@@ -0,0 +1,205 @@
+import re
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+from loggers.logger import logging
+
+_BLOCK_SPLIT = re.compile(r'\n\s*\n')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?。！？])\s+')
+_TOKEN_PIECES = re.compile(r'\w+|[^\w\s]')
+_TABLE_ROW = re.compile(r'^\s*\|')
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def approximate_token_count(text: str) -> int:
+    """BPE-like estimate: one token per punctuation mark, one per short word and more for long words"""
+    return sum(1 + len(piece) // 8 for piece in _TOKEN_PIECES.findall(text))
+
+def character_chunk_count(text: str, chunk_size: int) -> int:
+    """Number of chunks the original splitter made by cutting every chunk_size characters on word boundaries"""
+    count = 0
+    current_length = 0
+    for word in text.split():
+        if current_length + len(word) > chunk_size and count:
+            count += 1
+            current_length = len(word)
+        else:
+            if not count:
+                count = 1
+            current_length += len(word) + 1
+    return count
+
+def load_token_counter(tokenizer_file: Optional[str] = None) -> Callable[[str], int]:
+    """Use a HuggingFace `tokenizers` tokenizer.json when configured, otherwise the approximate counter"""
+    if tokenizer_file:
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_file(tokenizer_file)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            logging.warning(f"Falling back to approximate token counts, tokenizer load failed: {e}")
+    return approximate_token_count
+
+class TextChunker:
+    """Packs sentences and markdown tables into chunks bounded by a token budget.
+
+    Text is split on blank lines into paragraphs and tables. Paragraphs are packed sentence
+    by sentence and only single sentences over the budget are cut on word boundaries. Tables
+    are kept whole when they fit and are otherwise split into rows (repeating the header
+    rows). Trailing units of a chunk can be repeated at the start of the next one as overlap.
+    """
+
+    def __init__(self, token_counter: Callable[[str], int] = approximate_token_count):
+        self.count_tokens = token_counter
+
+    def _split_words(self, text: str, max_tokens: int) -> List[str]:
+        pieces = []
+        current = []
+        current_tokens = 0
+        for word in text.split():
+            word_tokens = self.count_tokens(word)
+            if current and current_tokens + word_tokens > max_tokens:
+                pieces.append(' '.join(current))
+                current = []
+                current_tokens = 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            pieces.append(' '.join(current))
+        return pieces
+
+    def _split_table(self, block: str, max_tokens: int) -> List[Tuple[str, str]]:
+        lines = block.split('\n')
+        header = '\n'.join(lines[:2])
+        header_tokens = self.count_tokens(header)
+        if header_tokens >= max_tokens // 2:
+            return [(line, '\n') for line in lines]
+        units = []
+        current = []
+        current_tokens = header_tokens
+        for line in lines[2:]:
+            line_tokens = self.count_tokens(line)
+            if current and current_tokens + line_tokens > max_tokens:
+                units.append(('\n'.join([header] + current), '\n\n'))
+                current = []
+                current_tokens = header_tokens
+            current.append(line)
+            current_tokens += line_tokens
+        if current:
+            units.append(('\n'.join([header] + current), '\n\n'))
+        return units
+
+    def _sentences(self, block: str) -> List[Tuple[str, str]]:
+        """Split a paragraph into (sentence, separator before it), keeping line breaks between sentences"""
+        sentences = []
+        start = 0
+        separator = '\n\n'
+        for match in _SENTENCE_SPLIT.finditer(block):
+            sentences.append((block[start:match.start()], separator))
+            separator = '\n' if '\n' in match.group() else ' '
+            start = match.end()
+        sentences.append((block[start:], separator))
+        return sentences
+
+    def _units(self, text: str, max_tokens: int) -> List[Tuple[str, str, int]]:
+        """Split text into (unit, separator before it, tokens) with every unit within the budget.
+
+        Paragraphs become sentences, so a chunk is topped up sentence by sentence instead of
+        being closed early by a paragraph that would not fit whole.
+        """
+        units = []
+        for block in _BLOCK_SPLIT.split(text):
+            block = block.strip()
+            if not block:
+                continue
+            lines = block.split('\n')
+            if len(lines) > 2 and all(_TABLE_ROW.match(line) for line in lines):
+                block_tokens = self.count_tokens(block)
+                if block_tokens <= max_tokens:
+                    units.append((block, '\n\n', block_tokens))
+                    continue
+                pieces = self._split_table(block, max_tokens)
+            else:
+                pieces = []
+                for sentence, separator in self._sentences(block):
+                    for word_index, piece in enumerate(self._split_words(sentence, max_tokens)):
+                        pieces.append((piece, separator if word_index == 0 else ' '))
+
+            for piece, separator in pieces:
+                units.append((piece, separator, self.count_tokens(piece)))
+        return units
+
+    def _pack(self, units: List[Tuple[str, str, int]], max_tokens: int,
+              overlap_tokens: int = 0) -> List[List[Tuple[str, str, int]]]:
+        overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+        chunks = []
+        current: List[Tuple[str, str, int]] = []
+        current_tokens = 0
+        for unit in units:
+            unit_tokens = unit[2]
+            if current and current_tokens + unit_tokens > max_tokens:
+                chunks.append(current)
+                carried = []
+                carried_tokens = 0
+                for previous in reversed(current):
+                    if carried_tokens + previous[2] > overlap_tokens or carried_tokens + previous[2] + unit_tokens > max_tokens:
+                        break
+                    carried.insert(0, previous)
+                    carried_tokens += previous[2]
+                current = carried
+                current_tokens = carried_tokens
+            current.append(unit)
+            current_tokens += unit_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def chunk(self, text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+        return [self._join(units) for units in self._pack(self._units(text, max_tokens), max_tokens, overlap_tokens)]
+
+    def chunk_layout(self, text: str, max_tokens: int, overlap_tokens: int = 0,
+                     previous: Optional[List[Tuple[str, int, str]]] = None) -> List[Tuple[str, str, int]]:
+        """Chunk text as (chunk, hash of its first unit, unit count), keeping previous chunks intact where possible.
+
+        `previous` is the layout of an earlier version of the text as (head hash, unit count,
+        chunk hash). Wherever the same run of units reappears it is emitted as the same chunk,
+        and only the units in between are packed afresh, so an edit does not shift every later
+        chunk boundary. Overlapping chunks share units, so they are packed afresh throughout.
+        """
+        units = self._units(text, max_tokens)
+        if not previous or overlap_tokens > 0:
+            packed = self._pack(units, max_tokens, overlap_tokens)
+        else:
+            by_head: Dict[str, List[Tuple[int, str]]] = {}
+            for head_hash, unit_count, chunk_hash in previous:
+                by_head.setdefault(head_hash, []).append((unit_count, chunk_hash))
+
+            packed = []
+            pending = []
+            position = 0
+            while position < len(units):
+                match = None
+                for unit_count, chunk_hash in by_head.get(text_hash(units[position][0]), []):
+                    candidate = units[position:position + unit_count]
+                    if len(candidate) == unit_count and text_hash(self._join(candidate)) == chunk_hash:
+                        match = candidate
+                        break
+                if match is None:
+                    pending.append(units[position])
+                    position += 1
+                    continue
+                packed.extend(self._pack(pending, max_tokens))
+                pending = []
+                packed.append(match)
+                position += len(match)
+            packed.extend(self._pack(pending, max_tokens))
+
+        return [(self._join(chunk_units), text_hash(chunk_units[0][0]), len(chunk_units)) for chunk_units in packed]
+
+    def _join(self, units: List[Tuple[str, str, int]]) -> str:
+        parts = []
+        for index, (unit, separator, _) in enumerate(units):
+            if index:
+                parts.append(separator)
+            parts.append(unit)
+        return ''.join(parts)